@@ -4,19 +4,17 @@ import base64
 import collections
 import errno
 import hashlib
+import itertools
 import json
 import os
 import re
 import shutil
 import subprocess
 import sys
-import urllib2
 import uuid
-from copy import deepcopy
 from datetime import datetime
-from threading import Lock
-from urllib2 import URLError
-import MySQLdb
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Thread
 import jinja2
 import math
 import requests
@@ -28,11 +26,15 @@ from OpenSSL.crypto import load_publickey, FILETYPE_PEM, X509, verify
 from flask import Flask, jsonify, abort, make_response, request, Response, \
     redirect
 from flask_httpauth import HTTPBasicAuth
+from tools.api.htmlDiff import HtmlDiff
+from tools.api.recordStore import RecordStore
 from tools.api.sender import Sender
-from tools.utility import repoutil, yangParser, messageFactory
+from tools.api.snapshot import Snapshot, MODULE_KEYS, project
+from tools.api.treeCache import TreeCache
+from tools.api.usersDb import UsersDb
+from tools.utility import httpClient, repoutil, yangParser, messageFactory
 from tools.utility.util import get_curr_dir
 from yangSearch.module import Module
-from yangSearch.rester import Rester, RestException
 
 LOGGER = lo.get_logger('api')
 url = 'https://github.com/'
@@ -53,109 +55,10 @@ class MyFlask(Flask):
 
     def process_response(self, response):
         self.response = response
-        self.create_response_only_latest_revision()
         self.create_response_with_yangsuite_link()
 
         return self.response
 
-    def create_response_only_latest_revision(self):
-        if request.args.get('latest-revision'):
-            if 'True' == request.args.get('latest-revision'):
-                if self.response.data:
-                    json_data = json.JSONDecoder(object_pairs_hook=collections.OrderedDict).decode(self.response.data)
-                else:
-                    return self.response
-                modules = None
-                if json_data.get('yang-catalog:modules') is not None:
-                    if json_data.get('yang-catalog:modules').get(
-                            'module') is not None:
-                        modules = json_data.get('yang-catalog:modules').get(
-                            'module')
-                elif json_data.get('module') is not None:
-                    modules = json_data.get('module')
-                modules_to_remove = []
-                if modules:
-                    if len(modules) > 0:
-                        newlist = sorted(modules, key=lambda k: k['name'])
-                        temp_module = None
-                        i = 0
-                        for mod in newlist:
-                            name = mod['name']
-                            if temp_module:
-                                if temp_module['name'] == name:
-                                    revisions = []
-                                    mod['index'] = i
-                                    year = int(temp_module['revision'].split('-')[0])
-                                    month = int(temp_module['revision'].split('-')[1])
-                                    day = int(temp_module['revision'].split('-')[2])
-                                    revisions.append(datetime(year, month, day))
-                                    year = int(mod['revision'].split('-')[0])
-                                    month = int(mod['revision'].split('-')[1])
-                                    day = int(mod['revision'].split('-')[2])
-                                    revisions.append(datetime(year, month, day))
-                                    latest = revisions.index(max(revisions))
-                                    if latest == 0:
-                                        modules_to_remove.append(mod['index'])
-                                    elif latest == 1:
-                                        modules_to_remove.append(temp_module['index'])
-                                else:
-                                    mod['index'] = i
-                                    temp_module = mod
-                            else:
-                                mod['index'] = i
-                                temp_module = mod
-                            i += 1
-                        for mod_to_remove in reversed(modules_to_remove):
-                            newlist.remove(newlist[mod_to_remove])
-                        for mod in newlist:
-                            if mod.get('index'):
-                                del mod['index']
-                        self.response.data = json.dumps(newlist)
-
-    def get_dependencies(self, mod, mods, inset):
-        if mod.get('dependencies'):
-            for dep in mod['dependencies']:
-                if dep['name'] in inset:
-                    continue
-                if dep.get('revision'):
-                    mods.add(dep['name'] + '@' + dep[
-                        'revision'] + '.yang')
-                    inset.add(dep['name'])
-                    search_filter = json.dumps({
-                        'input': {
-                            'name': dep['name'],
-                            'revision': dep['revision']
-                        }
-                    })
-                    rp = requests.post('{}/search-filter'.format(
-                        yangcatalog_api_prefix), search_filter,
-                        headers={
-                            'Content-type': 'application/json',
-                            'Accept': 'application/json'}
-                    )
-                    mo = rp.json()['yang-catalog:modules']['module'][0]
-                    self.get_dependencies(mo, mods, inset)
-                else:
-                    rp = requests.get('{}/search/name/{}'
-                                      .format(yangcatalog_api_prefix,
-                                              dep['name']))
-                    if rp.status_code == 404:
-                        continue
-                    mo = rp.json()['yang-catalog:modules']['module']
-                    revisions = []
-                    for m in mo:
-                        revision = m['revision']
-                        year = int(revision.split('-')[0])
-                        month = int(revision.split('-')[1])
-                        day = int(revision.split('-')[2])
-                        revisions.append(datetime(year, month, day))
-                    latest = revisions.index(max(revisions))
-                    inset.add(dep['name'])
-                    mods.add('{}@{}.yang'.format(dep['name'],
-                                                 mo[latest][
-                                                     'revision']))
-                    self.get_dependencies(mo[latest], mods, inset)
-
     def create_response_with_yangsuite_link(self):
         if request.headers.environ.get('HTTP_YANGSUITE'):
             if 'true' != request.headers.environ['HTTP_YANGSUITE']:
@@ -188,18 +91,11 @@ class MyFlask(Flask):
                     # be happy if someone already created the path
                     if e.errno != errno.EEXIST:
                         return 'Server error - could not create directory'
-                mods = set()
-                inset = set()
                 if len(modules) == 1:
                     defmod = modules[0]['name']
-                for mod in modules:
-                    name = mod['name']
-                    if name in inset:
-                        continue
-                    name += '@{}.yang'.format(mod['revision'])
-                    mods.add(name)
-                    inset.add(mod['name'])
-                    self.get_dependencies(mod, mods, inset)
+                with lock:
+                    current = get_snapshot()
+                mods = current.dependency_closure(modules)
 
                 modules = []
                 for mod in mods:
@@ -235,6 +131,21 @@ class MyFlask(Flask):
 
 app = MyFlask(__name__)
 lock = Lock()
+reload_lock = Lock()
+init_lock = Lock()
+application = None
+snapshot = None
+records = None
+users_db = None
+# populate removes the cache directory so records are kept next to it
+records_dir = get_curr_dir(__file__) + '/records'
+compress_records = False
+# number of seconds after which reload claimed by a worker that died expires
+RELOAD_TIMEOUT = 3600
+# number of modules and vendors downloaded from confd at once by update-cache
+CONFD_WORKERS = 10
+tree_cache = TreeCache(get_curr_dir(__file__) + '/cache/trees')
+html_diff = HtmlDiff()
 
 NS_MAP = {
     "http://cisco.com/": "cisco",
@@ -244,7 +155,7 @@ NS_MAP = {
 }
 
 
-def make_cache(credentials, response, is_uwsgi=True):
+def make_cache(credentials, response, is_uwsgi=True, generation=None):
     """After we delete or add modules we need to reload all the modules to the file
     for quicker search. This module is then loaded to the memory.
             Arguments:
@@ -252,20 +163,18 @@ def make_cache(credentials, response, is_uwsgi=True):
                     everything went through fine
                 :param credentials: (list) Basic authorization credentials - username, password
                     respectively
+                :param is_uwsgi: (str) 'True' if data should be saved to uwsgi cache
+                :param generation: (str) cache generation under which data are saved
                 :return 'work' if everything went through fine otherwise send back the reason
                     why it failed.
     """
     try:
         path = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/catalog?deep'
-        data = http_request(path, 'GET', '', credentials, 'application/vnd.yang.data+json').read()
+        data = http_request(path, 'GET', '', credentials, 'application/vnd.yang.data+json').content
 
         if is_uwsgi == 'True':
-            chunks = int(math.ceil(len(data)/float(64000)))
-            for i in range(0, chunks, 1):
-                uwsgi.cache_set('data{}'.format(i), data[i*64000: (i+1)*64000],
-                                0, 'main_cache')
+            chunks = set_chunks(generation, 'data', data, 64000, 'main_cache')
             LOGGER.info('all {} chunks are set in uwsgi cache'.format(chunks))
-            uwsgi.cache_set('chunks-data', repr(chunks), 0, 'cache_chunks')
         else:
             return data
     except:
@@ -275,6 +184,38 @@ def make_cache(credentials, response, is_uwsgi=True):
     return response
 
 
+def latest_revision_requested():
+    """Check whether request asks only for the latest revisions of the modules
+            :return True if latest-revision argument is set to True
+    """
+    return 'True' == request.args.get('latest-revision')
+
+
+def requested_fields():
+    """Get leafs of the modules requested with fields argument of the request.
+    Fields are sent as names of top level leafs separated by comma.
+            :return list of leafs or None if whole modules are requested
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def latest_revision_response(current, modules=None):
+    """Creates response with only the latest revision of every module. Modules
+    are sent as a list sorted by name.
+            Arguments:
+                :param current: (Snapshot) snapshot the modules were found in
+                :param modules: (list) modules found. If None all the modules
+                    in the catalog are used
+                :return: Response that can be returned.
+    """
+    return Response(json.dumps(project(current.latest_revisions(modules),
+                                       requested_fields())),
+                    mimetype='application/json')
+
+
 def create_response(body, status, headers=None):
     """Creates flask response that can be sent to sender.
             Arguments:
@@ -308,20 +249,17 @@ def http_request(path, method, json_data, http_credentials, header):
                 :return a response from the request.
     """
     try:
-        opener = urllib2.build_opener(urllib2.HTTPHandler)
-        request = urllib2.Request(path, data=json_data)
-        request.add_header('Content-Type', header)
-        request.add_header('Accept', header)
-        base64string = base64.b64encode('%s:%s' % (http_credentials[0], http_credentials[1]))
-        request.add_header("Authorization", "Basic %s" % base64string)
-        request.get_method = lambda: method
-        return opener.open(request)
-    except urllib2.HTTPError as e:
+        response = httpClient.request(method, path, data=json_data,
+                                      auth=(http_credentials[0], http_credentials[1]),
+                                      headers={'Content-Type': header, 'Accept': header})
+        response.raise_for_status()
+        return response
+    except requests.HTTPError as e:
         if method == 'DELETE':
             return
         LOGGER.error('Could not send request with body {} and path {}'.format(json_data, path))
         raise e
-    except URLError as e:
+    except requests.ConnectionError as e:
         LOGGER.error('Could not send request with body {} and path {} {}'.format(json_data, path, e))
         raise e
 
@@ -342,22 +280,7 @@ def authorize_for_sdos(request, organizations_sent, organization_parsed):
     """
     username = request.authorization['username']
     LOGGER.info('Checking sdo authorization for user {}'.format(username))
-    accessRigths = None
-    try:
-        db = MySQLdb.connect(host=dbHost, db=dbName, user=dbUser, passwd=dbPass)
-        # prepare a cursor object using cursor() method
-        cursor = db.cursor()
-        # execute SQL query using execute() method.
-        cursor.execute("SELECT * FROM `users`")
-        data = cursor.fetchall()
-
-        for row in data:
-            if row[1] == username:
-                accessRigths = row[7]
-                break
-        db.close()
-    except MySQLdb.MySQLError as err:
-        LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+    accessRigths = users_db.get_access_rights_sdo(username)
 
     passed = False
     if accessRigths == '/':
@@ -381,22 +304,7 @@ def authorize_for_vendors(request, body):
     """
     username = request.authorization['username']
     LOGGER.info('Checking vendor authorization for user {}'.format(username))
-    accessRigths = None
-    try:
-        db = MySQLdb.connect(host=dbHost, db=dbName, user=dbUser, passwd=dbPass)
-        # prepare a cursor object using cursor() method
-        cursor = db.cursor()
-        # execute SQL query using execute() method.
-        cursor.execute("SELECT * FROM `users`")
-        data = cursor.fetchall()
-
-        for row in data:
-            if row[1] == username:
-                accessRigths = row[8]
-                break
-        db.close()
-    except MySQLdb.MySQLError as err:
-        LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+    accessRigths = users_db.get_access_rights_vendor(username)
 
     rights = accessRigths.split('/')
     check_vendor = None
@@ -448,7 +356,7 @@ def check_authorized(signature, payload):
                 :param signature: (str) Signature returned by sign function
                 :param payload: (str) String that is encoded
     """
-    response = requests.get('https://api.travis-ci.org/config', timeout=10.0)
+    response = httpClient.get('https://api.travis-ci.org/config', timeout=10.0)
     response.raise_for_status()
     public_key = response.json()['config']['notifications']['webhook']['public_key']
     pkey_public_key = load_publickey(FILETYPE_PEM, public_key)
@@ -530,8 +438,8 @@ def check_local():
                         "base": "master"
                     }))
 
-                    r = requests.post(yang_models_url + '/pulls',
-                                      json=json_body, headers={'Authorization': 'token ' + token})
+                    r = httpClient.post(yang_models_url + '/pulls',
+                                        json=json_body, headers={'Authorization': 'token ' + token})
                     if r.status_code == requests.codes.created:
                         LOGGER.info('Pull request created successfully')
                         return make_response(jsonify({'info': 'Success'}), 201)
@@ -540,8 +448,8 @@ def check_local():
                         return make_response(jsonify({'Error': 'PR creation failed'}), 400)
             else:
                 LOGGER.warning('Travis job did not pass. Removing forked repository.')
-                requests.delete('https://api.github.com/repos/yang-catalog/yang',
-                                headers={'Authorization': 'token ' + token})
+                httpClient.delete('https://api.github.com/repos/yang-catalog/yang',
+                                  headers={'Authorization': 'token ' + token})
                 return make_response(jsonify({'info': 'Failed'}), 406)
         elif body['repository']['owner_name'] == 'YangModels':
             if body['result_message'] == 'Passed':
@@ -554,16 +462,16 @@ def check_local():
                         'body': 'AUTOMATED YANG CATALOG APPROVAL',
                         'event': 'APPROVE'
                     })
-                    response = requests.post(url, data, headers={'Authorization': 'token ' + admin_token})
+                    response = httpClient.post(url, data, headers={'Authorization': 'token ' + admin_token})
                     LOGGER.info('review response code {}. Merge response {}.'.format(
                             response.status_code, response.content))
                     data = json.dumps({'commit-title': 'Travis job passed',
                                        'sha': body['head_commit']})
-                    response = requests.put('https://api.github.com/repos/YangModels/yang/pulls/' + repr(pull_number) +
+                    response = httpClient.put('https://api.github.com/repos/YangModels/yang/pulls/' + repr(pull_number) +
                                  '/merge', data, headers={'Authorization': 'token ' + admin_token})
                     LOGGER.info('Merge response code {}. Merge response {}.'.format(response.status_code, response.content))
-                    requests.delete('https://api.github.com/repos/yang-catalog/yang',
-                                    headers={'Authorization': 'token ' + token})
+                    httpClient.delete('https://api.github.com/repos/yang-catalog/yang',
+                                      headers={'Authorization': 'token ' + token})
                     return make_response(jsonify({'info': 'Success'}), 201)
             else:
                 LOGGER.warning('Travis job did not pass. Removing pull request')
@@ -574,11 +482,11 @@ def check_local():
                     "state": "closed",
                     "base": "master"
                 }))
-                requests.patch('https://api.github.com/repos/YangModels/yang/pulls/' + pull_number, json=json_body,
-                               headers={'Authorization': 'token ' + token})
+                httpClient.patch('https://api.github.com/repos/YangModels/yang/pulls/' + pull_number, json=json_body,
+                                 headers={'Authorization': 'token ' + token})
                 LOGGER.warning(
                     'Travis job did not pass. Removing forked repository.')
-                requests.delete(
+                httpClient.delete(
                     'https://api.github.com/repos/yang-catalog/yang',
                     headers={'Authorization': 'token ' + token})
                 return make_response(jsonify({'info': 'Failed'}), 406)
@@ -610,30 +518,15 @@ def delete_modules(name, revision, organization):
     LOGGER.info('deleting module with name, revision and organization {} {} {}'.format(name, revision, organization))
     username = request.authorization['username']
     LOGGER.debug('Checking authorization for user {}'.format(username))
-    accessRigths = None
-    try:
-        db = MySQLdb.connect(host=dbHost, db=dbName, user=dbUser, passwd=dbPass)
-        # prepare a cursor object using cursor() method
-        cursor = db.cursor()
-        # execute SQL query using execute() method.
-        cursor.execute("SELECT * FROM `users`")
-        data = cursor.fetchall()
-
-        for row in data:
-            if row[1] == username:
-                accessRigths = row[7]
-                break
-        db.close()
-    except MySQLdb.MySQLError as err:
-        LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+    accessRigths = users_db.get_access_rights_sdo(username)
     try:
         response = http_request(
             protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/catalog/modules/module/' + name +
             ',' + revision + ',' + organization, 'GET', None, credentials, 'application/vnd.yang.data+json')
-    except urllib2.HTTPError as e:
+    except requests.HTTPError as e:
         return not_found()
 
-    read = json.loads(response.read())
+    read = json.loads(response.content)
     if read['yang-catalog:module']['organization'] != accessRigths and accessRigths != '/':
         return unauthorized()
 
@@ -666,22 +559,7 @@ def delete_vendor(value):
     LOGGER.info('Deleting vendor on path {}'.format(value))
     username = request.authorization['username']
     LOGGER.debug('Checking authorization for user {}'.format(username))
-    accessRigths = None
-    try:
-        db = MySQLdb.connect(host=dbHost, db=dbName, user=dbUser, passwd=dbPass)
-        # prepare a cursor object using cursor() method
-        cursor = db.cursor()
-        # execute SQL query using execute() method.
-        cursor.execute("SELECT * FROM `users`")
-        data = cursor.fetchall()
-
-        for row in data:
-            if row[1] == username:
-                accessRigths = row[8]
-                break
-        db.close()
-    except MySQLdb.MySQLError as err:
-        LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+    accessRigths = users_db.get_access_rights_vendor(username)
 
     rights = accessRigths.split('/')
     check_vendor = None
@@ -761,9 +639,9 @@ def add_modules():
     path = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/modules'
 
     base64string = base64.b64encode('%s:%s' % (credentials[0], credentials[1]))
-    response = requests.put(path, json.dumps(body), headers={'Authorization': 'Basic ' + base64string,
-                                                             'Content-type': 'application/vnd.yang.data+json',
-                                                             'Accept': 'application/vnd.yang.data+json'})
+    response = httpClient.put(path, json.dumps(body), headers={'Authorization': 'Basic ' + base64string,
+                                                               'Content-type': 'application/vnd.yang.data+json',
+                                                               'Accept': 'application/vnd.yang.data+json'})
 
     if response.status_code != 200 and response.status_code != 201 and response.status_code != 204:
         return create_response(response.content, response.status_code, response.headers.items())
@@ -792,7 +670,7 @@ def add_modules():
                        mod['name'] + ',' + mod['revision'] + ',' + mod['organization']
                 http_request(path, 'GET', None, credentials, 'application/vnd.yang.data+json')
                 continue
-            except urllib2.HTTPError as e:
+            except requests.HTTPError as e:
                 pass
         directory = '/'.join(sdo['path'].split('/')[:-1])
 
@@ -911,9 +789,9 @@ def add_vendors():
     path = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/platforms'
 
     base64string = base64.b64encode('%s:%s' % (credentials[0], credentials[1]))
-    response = requests.put(path, json.dumps(body), headers={'Authorization': 'Basic ' + base64string,
-                                                             'Content-type': 'application/vnd.yang.data+json',
-                                                             'Accept': 'application/vnd.yang.data+json'})
+    response = httpClient.put(path, json.dumps(body), headers={'Authorization': 'Basic ' + base64string,
+                                                               'Content-type': 'application/vnd.yang.data+json',
+                                                               'Accept': 'application/vnd.yang.data+json'})
 
     if response.status_code != 200 and response.status_code != 201 and response.status_code != 204:
         return create_response(response.content, response.status_code, response.headers.items())
@@ -984,6 +862,8 @@ def add_vendors():
 def index_search():
     """Search through the YANG keyword index for a given search pattern.
        The arguments are a payload specifying search options and filters.
+       Only a page of the results is sent if "limit" and optionally "offset"
+       are set. Results are streamed with stream=ndjson|json argument.
     """
     if not request.json:
         abort(400)
@@ -991,71 +871,156 @@ def index_search():
     payload = request.json
     if 'search' not in payload:
         return make_response(jsonify({'error': 'You must specify a "search" argument'}), 400)
+    limit = None
+    offset = 0
     try:
-        search_res = index.do_search(json.dumps(payload))
-        res = []
-        rest = Rester(yangcatalog_api_prefix)
-        rejects = {}
-        not_founds = {}
-
-        for row in search_res:
-            res_row = {}
-            res_row['node'] = row['node']
-            if 'filter' not in payload or 'module' in payload['filter']:
-                mod_obj = Module.module_factory(rest, row['module']['name'], row['module'][
-                                                'revision'], row['module']['organization'])
-                mod_sig = mod_obj.get_mod_sig()
-                if mod_sig in rejects:
-                    continue
-
-                if 'latest-revisions' in payload and payload['latest-revisions'] is True:
-                    if row['module']['revision'] != row['module']['latest_revision']:
-                        rejects[mod_sig] = True
-                        continue
-
-                mod_meta = None
-                try:
-                    if mod_sig not in not_founds:
-                        try:
-                            mod_meta = mod_obj.to_dict()
-                        except RestException as reste:
-                            if reste.get_response_code() == 404:
-                                not_founds[mod_sig] = True
-                            else:
-                                res_row['module'] = {
-                                    'error': 'Search failed at {}: {}'.format(mod_sig, reste)}
-
-                    if mod_meta is not None and ('include-mibs' not in payload or payload['include-mibs'] is False):
-                        if re.search('yang:smiv2:', mod_obj.get('namespace')):
-                            rejects[mod_sig] = True
-                            continue
-
-                    if mod_meta is not None and 'yang-versions' in payload and len(payload['yang-versions']) > 0:
-                        if mod_obj.get('yang-version') not in payload['yang-versions']:
-                            rejects[mod_sig] = True
-                            continue
-
-                    if mod_meta is not None:
-                        if 'filter' not in payload:
-                            # If the filter is not specified, return all
-                            # fields.
-                            res_row['module'] = mod_meta
-                        elif 'module' in payload['filter']:
-                            res_row['module'] = {}
-                            for field in payload['filter']['module']:
-                                if field in mod_meta:
-                                    res_row['module'][field] = mod_meta[field]
-                except Exception as e:
-                    res_row['module'] = {
-                        'error': 'Search failed at {}: {}'.format(mod_sig, e)}
-
-            res.append(res_row)
-
-        return jsonify({'results': res})
+        if payload.get('limit') is not None:
+            limit = int(payload['limit'])
+            offset = int(payload.get('offset') or 0)
+            if limit < 1 or offset < 0:
+                raise ValueError()
+    except (TypeError, ValueError):
+        return make_response(jsonify({'error': '"limit" needs to be a positive number and '
+                                               '"offset" a non negative number'}), 400)
+    stream = request.args.get('stream')
+    if stream not in [None, 'ndjson', 'json']:
+        abort(400)
+    with_module = 'filter' not in payload or 'module' in payload['filter']
+    options = dict(payload)
+    if not with_module:
+        # latest revisions filter applies only to the module metadata
+        options.pop('latest-revisions', None)
+    if limit is not None:
+        # one more row tells whether there is a next page
+        options['limit'] = limit + 1
+        options['offset'] = offset
+    try:
+        search_res = index.do_search(json.dumps(options))
+        next_offset = None
+        if limit is not None:
+            search_res = list(search_res)
+            if len(search_res) > limit:
+                search_res = search_res[:limit]
+                next_offset = offset + limit
+        current = None
+        if with_module:
+            with lock:
+                current = get_snapshot()
+        results = index_results(current, search_res, payload)
+
+        if stream is not None:
+            # first row is read here so the search errors are still sent
+            # with 500 status code before the streaming starts
+            first = list(itertools.islice(results, 1))
+            results = index_stream(itertools.chain(first, results))
+        if stream == 'ndjson':
+            response = Response(ndjson_chunks(results), mimetype='application/x-ndjson')
+            if next_offset is not None:
+                response.headers['X-Next-Offset'] = str(next_offset)
+            return response
+        elif stream == 'json':
+            end = ']}'
+            if next_offset is not None:
+                end = '], "next-offset": {}}}'.format(next_offset)
+            return Response(json_chunks('{"results": [', results, end),
+                            mimetype='application/json')
+        output = {'results': list(results)}
+        if next_offset is not None:
+            output['next-offset'] = next_offset
+        return jsonify(output)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 500)
 
 
+def index_results(current, rows, payload):
+    """Build results of the index search one by one as the rows are read
+    from the database. Metadata of every module is looked up only once.
+    Rows of the modules rejected by the filters are left out.
+            Arguments:
+                :param current: (Snapshot) snapshot the modules are looked up in.
+                    None if the module metadata are not sent
+                :param rows: (iterable) rows of the index search result
+                :param payload: (dict) search options and filters
+                :return generator of the results
+    """
+    metadata = {}
+    for row in rows:
+        res_row = {}
+        res_row['node'] = row['node']
+        if current is not None:
+            key = index_module_key(row)
+            if key not in metadata:
+                metadata[key] = index_metadata(current, key, row, payload)
+            mod_meta = metadata[key]
+            if mod_meta is False:
+                continue
+            if mod_meta is not None:
+                if 'filter' not in payload:
+                    # If the filter is not specified, return all
+                    # fields.
+                    res_row['module'] = mod_meta
+                else:
+                    res_row['module'] = {}
+                    for field in payload['filter']['module']:
+                        if field in mod_meta:
+                            res_row['module'][field] = mod_meta[field]
+
+        yield res_row
+
+
+def index_stream(results):
+    """Pass through streamed results of the index search. Status code is
+    already sent when the results are streamed so an error is logged and
+    sent as the last result to keep the response valid json.
+            Arguments:
+                :param results: (iterable) results of the index search
+                :return generator of the results
+    """
+    try:
+        for result in results:
+            yield result
+    except Exception as e:
+        LOGGER.error('Index search failed while streaming results: {}'.format(e))
+        yield {'error': str(e)}
+
+
+def index_module_key(row):
+    """Create key of the module found by the index search
+            Arguments:
+                :param row: (dict) row of the index search result
+                :return tuple of name, revision and organization
+    """
+    revision = row['module']['revision']
+    if revision == '':
+        revision = '1970-01-01'
+    return row['module']['name'], revision, row['module']['organization']
+
+
+def index_metadata(current, key, row, payload):
+    """Resolve metadata of the module found by the index search from the
+    snapshot. Module is rejected by the latest-revisions, include-mibs and
+    yang-versions filters.
+            Arguments:
+                :param current: (Snapshot) snapshot the module is looked up in
+                :param key: (tuple) key of the module
+                :param row: (dict) row of the index search result
+                :param payload: (dict) search options and filters
+                :return metadata of the module, None if the module is not in
+                    the catalog or False if the module is rejected
+    """
+    if payload.get('latest-revisions') is True and row['module']['revision'] != row['module']['latest_revision']:
+        return False
+    module = current.get_module(*key)
+    if module is None:
+        return None
+    if payload.get('include-mibs') is not True and re.search('yang:smiv2:', module.get('namespace') or ''):
+        return False
+    yang_versions = payload.get('yang-versions') or []
+    if len(yang_versions) > 0 and module.get('yang-version') not in yang_versions:
+        return False
+    return Module.module_factory(None, key[0], key[1], key[2], attrs=module).to_dict()
+
+
 @app.route('/search/<path:value>', methods=['GET'])
 def search(value):
     """Search for a specific leaf from yang-catalog.yang module in modules
@@ -1067,33 +1032,22 @@ def search(value):
     """
     path = value
     LOGGER.info('Searching for {}'.format(value))
-    split = value.split('/')[:-1]
     key = '/'.join(value.split('/')[:-1])
     value = value.split('/')[-1]
-    module_keys = ['ietf/ietf-wg', 'maturity-level', 'document-name', 'author-email', 'compilation-status', 'namespace',
-                   'conformance-type', 'module-type', 'organization', 'yang-version', 'name', 'revision', 'tree-type',
-                   'belongs-to', 'generated-from']
-    for module_key in module_keys:
-        if key == module_key:
-            with lock:
-                data = modules_data().get('module')
-            if data is None:
-                return not_found()
-            passed_data = []
-            for module in data:
-                count = -1
-                process(module, passed_data, value, module, split, count)
-
-            if len(passed_data) > 0:
-                modules = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-                    .decode(json.dumps(passed_data))
-                return Response(json.dumps({
-                    'yang-catalog:modules': {
-                        'module': modules
-                    }
-                }), mimetype='application/json')
-            else:
-                return not_found()
+    if key in MODULE_KEYS:
+        with lock:
+            current = get_snapshot()
+        passed_data = current.search(key, value)
+        if len(passed_data) > 0:
+            if latest_revision_requested():
+                return latest_revision_response(current, passed_data)
+            return Response(json.dumps({
+                'yang-catalog:modules': {
+                    'module': project(passed_data, requested_fields())
+                }
+            }), mimetype='application/json')
+        else:
+            return not_found()
     return Response(json.dumps({'error': 'Search on path {} is not supported'.format(path)})
                     , mimetype='application/json', status=400)
 
@@ -1175,11 +1129,7 @@ def create_reference(f1, r1):
         if e.errno != errno.EEXIST:
             return 'Server error - could not create directory'
     schema1 = '{}{}@{}.yang'.format(save_file_dir, f1, r1)
-    arguments = ['pyang', '-p', save_file_dir, '-f', 'tree', schema1]
-    pyang = subprocess.Popen(arguments,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-    stdout, stderr = pyang.communicate()
+    stdout, stderr = tree_cache.get_tree(schema1, save_file_dir)
     if stdout == '' and stderr != '':
         return create_bootstrap_danger()
     elif stdout != '' and stderr != '':
@@ -1234,74 +1184,34 @@ def create_update_from(f1, r1, f2, r2):
 @app.route('/services/diff-file/file1=<f1>@<r1>/file2=<f2>@<r2>',
            methods=['GET'])
 def create_diff_file(f1, r1, f2, r2):
-    try:
-        os.makedirs(get_curr_dir(__file__) + '/temp')
-    except OSError as e:
-        # be happy if someone already created the path
-        if e.errno != errno.EEXIST:
-            return 'Server error - could not create directory'
     schema1 = '{}{}@{}.yang'.format(save_file_dir, f1, r1)
     schema2 = '{}{}@{}.yang'.format(save_file_dir, f2, r2)
-
-    arguments = ['cat', schema1]
-    cat = subprocess.Popen(arguments, stdout=subprocess.PIPE,
-                           stderr=subprocess.PIPE)
-    stdout, stderr = cat.communicate()
-    file_name1 = 'schema1.txt'
-    with open('{}{}'.format(diff_file_dir, file_name1), 'w+') as f:
-        f.write('<pre>{}</pre>'.format(stdout))
-    arguments = ['cat', schema2]
-    cat = subprocess.Popen(arguments, stdout=subprocess.PIPE,
-                           stderr=subprocess.PIPE)
-    stdout, stderr = cat.communicate()
-    file_name2 = 'schema2.txt'
-    with open('{}{}'.format(diff_file_dir, file_name2), 'w+') as f:
-        f.write('<pre>{}</pre>'.format(stdout))
-    tree1 = 'https://yangcatalog.org/compatibility/{}'.format(file_name1)
-    tree2 = 'https://yangcatalog.org/compatibility/{}'.format(file_name2)
-    diff_url = ('https://www.ietf.org/rfcdiff/rfcdiff.pyht?url1={}&url2={}'
-                .format(tree1, tree2))
-    response = requests.get(diff_url)
-    os.remove(diff_file_dir + '/' + file_name1)
-    os.remove(diff_file_dir + '/' + file_name2)
-    return '<html><body>{}</body></html>'.format(response.content)
+    return html_diff.diff(read_file(schema1), read_file(schema2),
+                          '{}@{}.yang'.format(f1, r1), '{}@{}.yang'.format(f2, r2))
 
 
 @app.route('/services/diff-tree/file1=<f1>@<r1>/file2=<f2>@<r2>', methods=['GET'])
 def create_diff_tree(f1, r1, f2, r2):
-    try:
-        os.makedirs(get_curr_dir(__file__) + '/temp')
-    except OSError as e:
-        # be happy if someone already created the path
-        if e.errno != errno.EEXIST:
-            return 'Server error - could not create directory'
     schema1 = '{}{}@{}.yang'.format(save_file_dir, f1, r1)
     schema2 = '{}{}@{}.yang'.format(save_file_dir, f2, r2)
+    stdout1, stderr = tree_cache.get_tree(schema1, save_file_dir)
+    stdout2, stderr = tree_cache.get_tree(schema2, save_file_dir)
+    return html_diff.diff(stdout1, stdout2, '{}@{}.yang'.format(f1, r1),
+                          '{}@{}.yang'.format(f2, r2))
 
-    arguments = ['pyang', '-p', save_file_dir, '-f', 'tree', schema1]
-    pyang = subprocess.Popen(arguments,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-    stdout, stderr = pyang.communicate()
-    file_name1 = 'schema1.txt'
-    with open('{}{}'.format(diff_file_dir, file_name1), 'w+') as f:
-        f.write('<pre>{}</pre>'.format(stdout))
-    arguments = ['pyang', '-p', save_file_dir, '-f', 'tree', schema2]
-    pyang = subprocess.Popen(arguments,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-    stdout, stderr = pyang.communicate()
-    file_name2 = 'schema2.txt'
-    with open('{}{}'.format(diff_file_dir, file_name2), 'w+') as f:
-        f.write('<pre>{}</pre>'.format(stdout))
-    tree1 = 'https://yangcatalog.org/compatibility/{}'.format(file_name1)
-    tree2 = 'https://yangcatalog.org/compatibility/{}'.format(file_name2)
-    diff_url = ('https://www.ietf.org/rfcdiff/rfcdiff.pyht?url1={}&url2={}'
-                .format(tree1, tree2))
-    response = requests.get(diff_url)
-    os.remove(diff_file_dir + '/' + file_name1)
-    os.remove(diff_file_dir + '/' + file_name2)
-    return '<html><body>{}</body></html>'.format(response.content)
+
+def read_file(path):
+    """Read whole file
+            Arguments:
+                :param path: (str) path to the file
+                :return content of the file or empty string if it can not be read
+    """
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except IOError:
+        LOGGER.warning('Could not read file {}'.format(path))
+        return ''
 
 
 @app.route('/get-common', methods=['POST'])
@@ -1320,27 +1230,22 @@ def get_common():
                                    'body of request need to contain first and '
                                    'second container'}),
                              400)
-    response_first = rpc_search({'input': body['input']['first']})
-    response_second = rpc_search({'input': body['input']['second']})
+    with lock:
+        current = get_snapshot()
+    modules_first = current.filter_modules(body['input']['first'])
+    modules_second = current.filter_modules(body['input']['second'])
 
-    if response_first.status_code == 404 or response_second.status_code == 404:
+    if len(modules_first) == 0 or len(modules_second) == 0:
         return not_found()
 
-    data = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-        .decode(response_first.data)
-    modules_first = data['yang-catalog:modules']['module']
-    data = json.JSONDecoder(object_pairs_hook=collections.OrderedDict)\
-        .decode(response_second.data)
-    modules_second = data['yang-catalog:modules']['module']
-
+    names_second = set(mod['name'] for mod in modules_second)
     output_modules_list = []
-    names = []
+    names = set()
     for mod_first in modules_first:
-        for mod_second in modules_second:
-            if mod_first['name'] == mod_second['name']:
-                if mod_first['name'] not in names:
-                    names.append(mod_first['name'])
-                    output_modules_list.append(mod_first)
+        name = mod_first['name']
+        if name in names_second and name not in names:
+            names.add(name)
+            output_modules_list.append(mod_first)
     if len(output_modules_list) == 0:
         return not_found()
     return Response(json.dumps({'output': output_modules_list}),
@@ -1363,37 +1268,34 @@ def check_semver():
                                    'body of request need to contain new'
                                    ' and old container'}),
                              400)
-    response_new = rpc_search({'input': body['input']['new']})
-    response_old = rpc_search({'input': body['input']['old']})
+    with lock:
+        current = get_snapshot()
+    modules_new = current.filter_modules(body['input']['new'])
+    modules_old = current.filter_modules(body['input']['old'])
 
-    if response_new.status_code == 404 or response_old.status_code == 404:
+    if len(modules_new) == 0 or len(modules_old) == 0:
         return not_found()
 
-    data = json.loads(response_new.data)
-    modules_new = data['yang-catalog:modules']['module']
-    data = json.loads(response_old.data)
-    modules_old = data['yang-catalog:modules']['module']
+    new_by_key = {}
+    for mod_new in modules_new:
+        new_by_key.setdefault((mod_new['name'], mod_new['organization']),
+                              mod_new)
 
     output_modules_list = []
     for mod_old in modules_old:
-        name_new = None
         semver_new = None
-        revision_new = None
-        status_new = None
         name_old = mod_old['name']
         revision_old = mod_old['revision']
         organization_old = mod_old['organization']
         status_old = mod_old['compilation-status']
-        for mod_new in modules_new:
-            name_new = mod_new['name']
-            revision_new = mod_new['revision']
-            organization_new = mod_new['organization']
-            status_new = mod_new['compilation-status']
-            if name_new == name_old and organization_new == organization_old:
-                if revision_old == revision_new:
-                    break
-                semver_new = mod_new.get('derived-semantic-version')
-                break
+        mod_new = new_by_key.get((name_old, organization_old))
+        if mod_new is None:
+            continue
+        name_new = mod_new['name']
+        revision_new = mod_new['revision']
+        status_new = mod_new['compilation-status']
+        if revision_old != revision_new:
+            semver_new = mod_new.get('derived-semantic-version')
         if semver_new:
             semver_old = mod_old.get('derived-semantic-version')
             if semver_old:
@@ -1440,373 +1342,24 @@ def check_semver():
 
 @app.route('/search-filter', methods=['POST'])
 def rpc_search(body=None):
-    if body is None:
+    from_request = body is None
+    if from_request:
         body = request.json
     LOGGER.info('Searching and filtering modules based on RPC {}'
                 .format(json.dumps(body)))
     with lock:
-        data = modules_data()['module']
+        current = get_snapshot()
     body = body.get('input')
     if body:
-        partial = body.get('partial')
-        if partial is None:
-            partial = False
-        passed_modules = []
-        if partial:
-            for module in data:
-                passed = True
-                if 'dependencies' in body:
-                    submodules = deepcopy(module.get('dependencies'))
-                    if submodules is None:
-                        continue
-                    for sub in body['dependencies']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name not in submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision not in submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema not in submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'dependents' in body:
-                    submodules = deepcopy(module.get('dependents'))
-                    if submodules is None:
-                        continue
-                    for sub in body['dependents']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name not in submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision not in submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema not in submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'submodule' in body:
-                    submodules = deepcopy(module.get('submodule'))
-                    if submodules is None:
-                        continue
-                    for sub in body['submodule']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name not in submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision not in submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema not in submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'implementations' in body:
-                    implementations = deepcopy(module.get('implementations'))
-                    if implementations is None:
-                        continue
-                    passed = True
-                    for imp in body['implementations']['implementation']:
-                        if not passed:
-                            break
-                        for leaf in imp:
-                            found = False
-                            impls = []
-                            if leaf == 'deviation':
-                                for implementation in implementations[
-                                    'implementation']:
-                                    deviations = implementation.get('deviation')
-                                    if deviations is None:
-                                        continue
-                                    for dev in imp[leaf]:
-                                        found = True
-                                        name = dev.get('name')
-                                        revision = dev.get('revision')
-                                        for deviation in deviations:
-                                            found = True
-                                            if name:
-                                                if name not in deviation['name']:
-                                                    found = False
-                                            if not found:
-                                                continue
-                                            if revision:
-                                                if revision not in deviation['revision']:
-                                                    found = False
-                                            if found:
-                                                break
-                                        if not found:
-                                            break
-                                    if not found:
-                                        continue
-                                    else:
-                                        impls.append(implementation)
-                                if not found:
-                                    passed = False
-                                    break
-                            elif leaf == 'feature':
-                                for implementation in implementations['implementation']:
-                                    if implementation.get(leaf) is None:
-                                        continue
-                                    if imp[leaf] in implementation[leaf]:
-                                        found = True
-                                        impls.append(implementation)
-                                        continue
-                                if not found:
-                                    passed = False
-                            else:
-                                for implementation in implementations['implementation']:
-                                    if implementation.get(leaf) is None:
-                                        continue
-                                    if imp[leaf] in implementation[leaf]:
-                                        found = True
-                                        impls.append(implementation)
-                                        continue
-                                if not found:
-                                    passed = False
-                            if not passed:
-                                break
-                            implementations['implementation'] = impls
-                if not passed:
-                    continue
-                for leaf in body:
-                    if leaf != 'implementations' and leaf != 'submodule':
-                        module_leaf = module.get(leaf)
-                        if module_leaf:
-                            if body[leaf] not in module_leaf:
-                                passed = False
-                                break
-                if passed:
-                    passed_modules.append(module)
-        else:
-            for module in data:
-                passed = True
-                if 'dependencies' in body:
-                    submodules = deepcopy(module.get('dependencies'))
-                    if submodules is None:
-                        continue
-                    for sub in body['dependencies']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name != submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision != submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema != submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'dependents' in body:
-                    submodules = deepcopy(module.get('dependents'))
-                    if submodules is None:
-                        continue
-                    for sub in body['dependents']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name != submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision!= submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema != submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'submodule' in body:
-                    submodules = deepcopy(module.get('submodule'))
-                    if submodules is None:
-                        continue
-                    for sub in body['submodule']:
-                        found = True
-                        name = sub.get('name')
-                        revision = sub.get('revision')
-                        schema = sub.get('schema')
-                        for submodule in submodules:
-                            found = True
-                            if name:
-                                if name != submodule['name']:
-                                    found = False
-                            if not found:
-                                continue
-                            if revision:
-                                if revision != submodule['revision']:
-                                    found = False
-                            if not found:
-                                continue
-                            if schema:
-                                if schema != submodule['schema']:
-                                    found = False
-                            if found:
-                                break
-
-                        if not found:
-                            passed = False
-                            break
-                if not passed:
-                    continue
-                if 'implementations' in body:
-                    implementations = deepcopy(module.get('implementations'))
-                    if implementations is None:
-                        continue
-                    passed = True
-                    for imp in body['implementations']['implementation']:
-                        if not passed:
-                            break
-                        for leaf in imp:
-                            found = False
-                            impls = []
-                            if leaf == 'deviation':
-                                for implementation in implementations[
-                                    'implementation']:
-                                    deviations = implementation.get('deviation')
-                                    if deviations is None:
-                                        continue
-                                    for dev in imp[leaf]:
-                                        found = True
-                                        name = dev.get('name')
-                                        revision = dev.get('revision')
-                                        for deviation in deviations:
-                                            found = True
-                                            if name:
-                                                if name != deviation['name']:
-                                                    found = False
-                                            if not found:
-                                                continue
-                                            if revision:
-                                                if revision != deviation['revision']:
-                                                    found = False
-                                            if found:
-                                                break
-                                        if not found:
-                                            break
-                                    if not found:
-                                        continue
-                                    else:
-                                        impls.append(implementation)
-                                if not found:
-                                    passed = False
-                                    break
-                            elif leaf == 'feature':
-                                for implementation in implementations['implementation']:
-                                    if implementation.get(leaf) is None:
-                                        continue
-                                    if imp[leaf] == implementation[leaf]:
-                                        found = True
-                                        impls.append(implementation)
-                                        continue
-                                if not found:
-                                    passed = False
-                            else:
-                                for implementation in implementations['implementation']:
-                                    if implementation.get(leaf) is None:
-                                        continue
-                                    if imp[leaf] == implementation[leaf]:
-                                        found = True
-                                        impls.append(implementation)
-                                        continue
-                                if not found:
-                                    passed = False
-                            if not passed:
-                                break
-                            implementations['implementation'] = impls
-                if not passed:
-                    continue
-                for leaf in body:
-                    if (leaf != 'implementations' and leaf != 'submodule'
-                        and leaf != 'dependencies' and leaf != 'dependents'):
-                        if body[leaf] != module.get(leaf):
-                            passed = False
-                            break
-                if passed:
-                    passed_modules.append(module)
+        passed_modules = current.filter_modules(body)
         if len(passed_modules) > 0:
-            modules = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-                .decode(json.dumps(passed_modules))
+            if from_request:
+                if latest_revision_requested():
+                    return latest_revision_response(current, passed_modules)
+                passed_modules = project(passed_modules, requested_fields())
             return Response(json.dumps({
                 'yang-catalog:modules': {
-                    'module': modules
+                    'module': passed_modules
                 }
             }), mimetype='application/json')
         else:
@@ -1827,15 +1380,17 @@ def search_vendors(value):
                 :return response to the request.
     """
     LOGGER.info('Searching for specific vendors {}'.format(value))
-    path = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/catalog/vendors/' + value + '?deep'
-    data = requests.get(path, auth=(credentials[0], credentials[1]),
-                        headers={'Accept': 'application/vnd.yang.data+json'})
-    if data.status_code == 200 or data.status_code == 204:
-        data = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-            .decode(data.content)
-        return Response(json.dumps(data), mimetype='application/json')
-    else:
+    with lock:
+        current = get_snapshot()
+    found = current.get_vendors([part for part in value.split('/') if part])
+    if found is None:
         return not_found()
+    name, node = found
+    data = {'yang-catalog:' + name: node}
+    if isinstance(node, list):
+        # confd sends content of a whole list wrapped in a collection
+        data = {'collection': data}
+    return Response(json.dumps(data), mimetype='application/json')
 
 
 @app.route('/search/modules/<name>,<revision>,<organization>', methods=['GET'])
@@ -1848,24 +1403,104 @@ def search_module(name, revision, organization):
                 :return response to the request with job_id that user can use to
                     see if the job is still on or Failed or Finished successfully
     """
+    LOGGER.info('Searching for module {}, {}, {}'.format(name, revision,
+                                                         organization))
     with lock:
-        LOGGER.info('Searching for module {}, {}, {}'.format(name, revision,
-                                                             organization))
-        if uwsgi.cache_exists(name + '@' + revision + '/' + organization,
-                              'cache_chunks'):
-            chunks = uwsgi.cache_get(name + '@' + revision + '/' + organization,
-                                     'cache_chunks')
-            data = ''
-            for i in range(0, int(chunks), 1):
-                data += uwsgi.cache_get(name + '@' + revision + '/' +
-                                        organization + '-' + repr(i),
-                                        'cache_modules')
-
-            return Response(json.dumps({
-                'module': [json.JSONDecoder(object_pairs_hook=collections.OrderedDict)\
-                    .decode(data)]
-            }), mimetype='application/json')
-        return not_found()
+        current = get_records()
+    data = current.get(module_record_key(name, revision, organization))
+    if data is not None:
+        fields = requested_fields()
+        if fields is None:
+            # record is sent as it is saved without decoding it
+            if latest_revision_requested():
+                return Response('[{}]'.format(data), mimetype='application/json')
+            return Response('{{"module": [{}]}}'.format(data), mimetype='application/json')
+        module = json.JSONDecoder(object_pairs_hook=collections.OrderedDict)\
+            .decode(data)
+        modules = project([module], fields)
+        if latest_revision_requested():
+            return Response(json.dumps(modules), mimetype='application/json')
+        return Response(json.dumps({
+            'module': modules
+        }), mimetype='application/json')
+    return not_found()
+
+
+@app.route('/search/modules', methods=['POST'])
+def search_modules():
+    """Search for a list of modules defined with name, revision and organization
+    at once. Modules are sent in the body of the request as
+    {"input": {"module": [{"name": ..., "revision": ..., "organization": ...}]}}
+            :return response to the request with all the modules found and
+                with list of the modules that were not found
+    """
+    body = request.json
+    if body is None or body.get('input') is None:
+        return make_response(
+            jsonify({'error': 'body request has to start with "input" container'}),
+            400)
+    keys = body['input'].get('module')
+    if not isinstance(keys, list):
+        return make_response(jsonify({'error': 'body of request need to contain '
+                                               'list of modules'}), 400)
+    LOGGER.info('Searching for {} modules'.format(len(keys)))
+    with lock:
+        current = get_snapshot()
+    found = []
+    missing = []
+    for key in keys:
+        try:
+            module = current.get_module(key['name'], key['revision'],
+                                        key['organization'])
+        except (KeyError, TypeError):
+            return make_response(jsonify({'error': 'every module needs to contain '
+                                                   'name, revision and organization'}),
+                                 400)
+        if module is None:
+            missing.append(key)
+        else:
+            found.append(module)
+    return Response(json.dumps({
+        'module': project(found, requested_fields()),
+        'missing': missing
+    }), mimetype='application/json')
+
+
+@app.route('/search/implementations', methods=['POST'])
+def search_implementations():
+    """Search for platforms that implement a list of modules at once. Modules
+    are sent in the body of the request as
+    {"input": {"module": [{"name": ..., "revision": ..., "organization": ...,
+    "feature": [...], "deviation": [...]}]}}. Only the name is mandatory.
+    Implementations need to have all the features and deviations listed
+    with the module.
+            :return response to the request with vendor, platform,
+                software-version and software-flavor of all the implementations
+                found together with name, revision and organization of the module
+    """
+    body = request.json
+    if body is None or body.get('input') is None:
+        return make_response(
+            jsonify({'error': 'body request has to start with "input" container'}),
+            400)
+    searched = body['input'].get('module')
+    if not isinstance(searched, list):
+        return make_response(jsonify({'error': 'body of request need to contain '
+                                               'list of modules'}), 400)
+    LOGGER.info('Searching for implementations of {} modules'.format(len(searched)))
+    with lock:
+        current = get_snapshot()
+    found = []
+    for module in searched:
+        try:
+            found.extend(current.find_implementations(
+                module['name'], module.get('revision'), module.get('organization'),
+                module.get('feature') or [], module.get('deviation') or []))
+        except (KeyError, TypeError, AttributeError):
+            return make_response(jsonify({'error': 'every module needs to contain '
+                                                   'name'}), 400)
+    return Response(json.dumps({'implementation': found}),
+                    mimetype='application/json')
 
 
 @app.route('/search/modules', methods=['GET'])
@@ -1875,7 +1510,32 @@ def get_modules():
     """
     with lock:
         LOGGER.info('Searching for modules')
-        return Response(json.dumps(modules_data()), mimetype='application/json')
+        current = get_snapshot()
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    stream = request.args.get('stream')
+    fields = requested_fields()
+    if not paginated and stream is None:
+        if latest_revision_requested():
+            return latest_revision_response(current)
+        if fields is None:
+            return Response(json.dumps(current.modules), mimetype='application/json')
+    if latest_revision_requested():
+        modules = current.latest_revisions()
+    else:
+        modules = current.modules.get('module', [])
+    modules, cursor = requested_page(current, modules)
+    modules = project(modules, fields)
+    if stream == 'ndjson':
+        return Response(ndjson_chunks(modules), mimetype='application/x-ndjson')
+    elif stream == 'json':
+        return Response(json_chunks('{"module": [', modules, ']}', cursor),
+                        mimetype='application/json')
+    elif stream is not None:
+        abort(400)
+    output = {'module': modules}
+    if cursor is not None:
+        output['next-cursor'] = cursor
+    return Response(json.dumps(output), mimetype='application/json')
 
 
 @app.route('/search/vendors', methods=['GET'])
@@ -1912,11 +1572,107 @@ def get_catalog():
     #        except:
     #            LOGGER.error('Unexpected error: {}'.format(sys.exc_info()[0]))
     #            return not_found()
-    data = catalog_data()
+    with lock:
+        current = get_snapshot()
+    data = current.catalog
     if data is None:
         return not_found()
-    else:
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    stream = request.args.get('stream')
+    if not paginated and stream is None:
         return Response(json.dumps(data), mimetype='application/json')
+    modules, cursor = requested_page(current, current.modules.get('module', []))
+    # vendors can not be split to pages so they are sent with the first page only
+    vendors = None
+    if request.args.get('cursor') is None:
+        vendors = current.vendors
+    if stream == 'ndjson':
+        lines = ndjson_chunks({'module': module} for module in modules)
+        if vendors is not None:
+            lines = itertools.chain(lines, ndjson_chunks([{'vendors': vendors}]))
+        return Response(lines, mimetype='application/x-ndjson')
+    elif stream == 'json':
+        end = ']}'
+        if vendors is not None:
+            end += ', "vendors": {}'.format(json.dumps(vendors))
+        end += '}}'
+        return Response(json_chunks('{"yang-catalog:catalog": {"modules": {"module": [',
+                                    modules, end, cursor),
+                        mimetype='application/json')
+    elif stream is not None:
+        abort(400)
+    catalog = collections.OrderedDict([('modules', {'module': modules})])
+    if vendors is not None:
+        catalog['vendors'] = vendors
+    output = {'yang-catalog:catalog': catalog}
+    if cursor is not None:
+        output['next-cursor'] = cursor
+    return Response(json.dumps(output), mimetype='application/json')
+
+
+def requested_page(current, modules):
+    """Cut modules to the page requested with limit and cursor arguments of
+    the request. Cursor is bound to the cache generation and the number of its
+    deltas it was created for, so it expires when any module changes.
+            Arguments:
+                :param current: (Snapshot) snapshot the modules were taken from
+                :param modules: (list) all the modules that can be sent
+                :return tuple of modules on the page and cursor of the next
+                    page. Cursor is None if this is the last page
+    """
+    offset = 0
+    limit = None
+    try:
+        if request.args.get('limit') is not None:
+            limit = int(request.args['limit'])
+            if limit < 1:
+                abort(400)
+        if request.args.get('cursor') is not None:
+            generation, deltas, offset = base64.urlsafe_b64decode(
+                str(request.args['cursor'])).rsplit(':', 2)
+            offset = int(offset)
+            if (generation, int(deltas)) != (current.generation, current.deltas):
+                LOGGER.warning('Cursor of cache generation {} with {} deltas expired'
+                               .format(generation, deltas))
+                abort(410)
+    except (TypeError, ValueError):
+        abort(400)
+    if limit is None:
+        return modules[offset:], None
+    cursor = None
+    if offset + limit < len(modules):
+        cursor = base64.urlsafe_b64encode('{}:{}:{}'.format(current.generation, current.deltas,
+                                                            offset + limit))
+    return modules[offset:offset + limit], cursor
+
+
+def ndjson_chunks(items):
+    """Stream items as newline delimited json.
+            Arguments:
+                :param items: (iterable) items to send
+                :return generator of json lines
+    """
+    for item in items:
+        yield json.dumps(item) + '\n'
+
+
+def json_chunks(start, items, end, cursor=None):
+    """Stream items as a json array enclosed in start and end.
+            Arguments:
+                :param start: (str) json that opens the array
+                :param items: (iterable) items of the array
+                :param end: (str) json that closes the array and the start
+                :param cursor: (str) cursor of the next page added to the end
+                :return generator of json chunks
+    """
+    yield start
+    separator = ''
+    for item in items:
+        yield separator + json.dumps(item)
+        separator = ', '
+    if cursor is not None:
+        end = end[:-1] + ', "next-cursor": {}}}'.format(json.dumps(cursor))
+    yield end
 
 
 @app.route('/job/<job_id>', methods=['GET'])
@@ -1996,8 +1752,160 @@ def load_to_memory():
         return unauthorized
     if get_password(username) != hash_pw(request.authorization['password']):
         return unauthorized()
-    load(True)
-    return make_response(jsonify({'info': 'Success'}), 201)
+    reload_id = uuid.uuid4().hex
+    if not reload_lock.acquire(False):
+        return reload_in_progress()
+    # reload_lock guards only this worker, reload/running is claimed by one
+    # of the workers. cache_set does not replace a claim of another worker
+    if not uwsgi.cache_set('reload/running', reload_id, RELOAD_TIMEOUT, 'cache_chunks'):
+        reload_lock.release()
+        return reload_in_progress()
+    set_reload_status(reload_id, 'In progress')
+    thread = Thread(target=reload_in_background, args=(reload_id,))
+    thread.daemon = True
+    thread.start()
+    return make_response(jsonify({'info': 'Reload started',
+                                  'reload-id': reload_id}), 202)
+
+
+def reload_in_progress():
+    return make_response(jsonify({'info': 'Reload already in progress',
+                                  'reload-id': uwsgi.cache_get(
+                                      'reload/running', 'cache_chunks')}),
+                         202)
+
+
+@app.route('/load-cache/<reload_id>', methods=['GET'])
+def get_reload(reload_id):
+    """Search for a reload_id to see the process of the cache reload
+                :return response to the request with the reload
+    """
+    LOGGER.info('Searching for reload_id {}'.format(reload_id))
+    result = reload_status(reload_id)
+    if result is None:
+        return not_found()
+    return jsonify({'info': {'reload-id': reload_id,
+                             'result': result}
+                    })
+
+
+def reload_in_background(reload_id):
+    """Build and publish a new cache generation while the old one is still
+    being served. Must be started with reload_lock held which is released
+    once the reload is done.
+            Arguments:
+                :param reload_id: (str) id of the reload used as new cache generation
+    """
+    try:
+        if build_generation(reload_id):
+            set_reload_status(reload_id, 'Finished successfully')
+        else:
+            set_reload_status(reload_id, 'Failed')
+    except:
+        e = sys.exc_info()[0]
+        LOGGER.error('Reload {} failed. Error: {}'.format(reload_id, e))
+        set_reload_status(reload_id, 'Failed')
+    finally:
+        uwsgi.lock()
+        try:
+            if uwsgi.cache_get('reload/running', 'cache_chunks') == reload_id:
+                uwsgi.cache_del('reload/running', 'cache_chunks')
+        finally:
+            uwsgi.unlock()
+        reload_lock.release()
+
+
+def reload_status(reload_id):
+    return uwsgi.cache_get('reload/{}'.format(reload_id), 'cache_chunks')
+
+
+def set_reload_status(reload_id, status):
+    uwsgi.cache_update('reload/{}'.format(reload_id), status, 86400,
+                       'cache_chunks')
+
+
+@app.route('/update-cache', methods=['POST'])
+@auth.login_required
+def update_cache():
+    """Apply changes of some of the modules and vendors to the cache without
+    reloading whole catalog. Changed modules and vendor subtrees are downloaded
+    from confd and published as a delta of the current cache generation that
+    every worker applies to its snapshot and module records.
+            :return response to the request.
+    """
+    username = request.authorization['username']
+    if username != 'admin':
+        return unauthorized()
+    if get_password(username) != hash_pw(request.authorization['password']):
+        return unauthorized()
+    body = request.json
+    if body is None or body.get('input') is None:
+        return make_response(
+            jsonify({'error': 'body request has to start with "input" container'}),
+            400)
+    body = body['input']
+    with lock:
+        generation = get_snapshot().generation
+    prefix = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/catalog/'
+    to_update = body.get('modules-to-update', [])
+    vendor_paths = body.get('vendors', [])
+    responses = get_from_confd(
+        ['{}modules/module/{},{},{}?deep'.format(prefix, mod['name'], mod['revision'],
+                                                 mod['organization']) for mod in to_update] +
+        [prefix + 'vendors/' + value + '?deep' for value in vendor_paths])
+    modules = []
+    deleted = []
+    for mod, (path, data) in zip(to_update, responses[:len(to_update)]):
+        if data.status_code == 200:
+            modules.append(json.JSONDecoder(object_pairs_hook=collections.OrderedDict)
+                           .decode(data.content)['yang-catalog:module'])
+        elif data.status_code == 404:
+            deleted.append([mod['name'], mod['revision'], mod['organization']])
+        else:
+            LOGGER.error('Could not get module from path {}. Error: {}'.format(path, data.content))
+            return make_response(jsonify({'error': 'Server error - downloading module'}), 500)
+    for mod in body.get('modules-to-delete', []):
+        deleted.append([mod['name'], mod['revision'], mod['organization']])
+    vendors = []
+    for value, (path, data) in zip(vendor_paths, responses[len(to_update):]):
+        if data.status_code == 200:
+            vendors.append([value, json.JSONDecoder(object_pairs_hook=collections.OrderedDict)
+                           .decode(data.content).values()[0]])
+        elif data.status_code == 404:
+            vendors.append([value, None])
+        else:
+            LOGGER.error('Could not get vendors from path {}. Error: {}'.format(path, data.content))
+            return make_response(jsonify({'error': 'Server error - downloading vendors'}), 500)
+    # reload that finished meanwhile replaced the generation the delta belongs
+    # to and reload still running may have downloaded catalog before the change
+    if (uwsgi.cache_get('generation', 'cache_chunks') != generation or
+            uwsgi.cache_get('reload/running', 'cache_chunks') is not None):
+        return make_response(jsonify({'error': 'Cache generation {} was reloaded meanwhile. '
+                                               'Send the update again'.format(generation)}), 409)
+    delta = publish_delta(generation, {'modules': modules, 'deleted': deleted,
+                                       'vendors': vendors})
+    return make_response(jsonify({'info': 'Success', 'delta': delta}), 201)
+
+
+def get_from_confd(paths):
+    """Download paths from confd concurrently using at most CONFD_WORKERS
+    connections.
+            Arguments:
+                :param paths: (list) urls to download
+                :return list of path and response tuples in the order of the paths
+    """
+    def get_one(path):
+        return path, httpClient.get(path, auth=(credentials[0], credentials[1]),
+                                    headers={'Accept': 'application/vnd.yang.data+json'})
+
+    if len(paths) == 0:
+        return []
+    pool = ThreadPool(min(CONFD_WORKERS, len(paths)))
+    try:
+        return pool.map(get_one, paths)
+    finally:
+        pool.close()
+        pool.join()
 
 
 @app.route('/contributors', methods=['GET'])
@@ -2014,125 +1922,245 @@ def get_organizations():
     return resp
 
 
+def get_snapshot():
+    """Get decoded catalog of the current cache generation. Catalog is decoded
+    only if generation saved in uwsgi cache is different from generation of
+    the snapshot that this worker already holds. Deltas of the generation that
+    were published since are applied to it. Must be called with lock held.
+            :return Snapshot of the current cache generation
+    """
+    global snapshot
+    generation = uwsgi.cache_get('generation', 'cache_chunks')
+    if snapshot is None or snapshot.generation != generation:
+        generation, data = get_published('data', 'main_cache')
+        if data is not None:
+            LOGGER.info('Cache generation changed to {}. Decoding catalog'.format(generation))
+            snapshot = Snapshot(generation, data)
+        elif snapshot is None:
+            LOGGER.error('Catalog of cache generation {} is missing'.format(generation))
+            abort(503)
+    while True:
+        data = get_chunks(snapshot.generation, 'delta-{}'.format(snapshot.deltas),
+                          'main_cache')
+        if data is None:
+            break
+        delta = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
+            .decode(data)
+        snapshot = snapshot.apply(delta['modules'], delta['deleted'],
+                                  [(path.split('/'), value)
+                                   for path, value in delta['vendors']])
+    stats = Module.set_generation((snapshot.generation, snapshot.deltas))
+    if stats is not None:
+        LOGGER.info('Module cache cleared with {size} modules. {hits} hits and {misses} misses so far'
+                    .format(**stats))
+    return snapshot
+
+
 def modules_data():
-    chunks = int(uwsgi.cache_get('chunks-modules', 'cache_chunks'))
-    data = ''
-    for i in range(0, chunks, 1):
-        data += uwsgi.cache_get('modules-data{}'.format(i), 'main_cache')
-    json_data = \
-        json.JSONDecoder(object_pairs_hook=collections.OrderedDict).decode(data)
-    return json_data
+    return get_snapshot().modules
 
 
 def vendors_data():
-    chunks = int(uwsgi.cache_get('chunks-vendor', 'cache_chunks'))
-    data = ''
-    for i in range(0, chunks, 1):
-        data += uwsgi.cache_get('vendors-data{}'.format(i), 'main_cache')
-    json_data = \
-        json.JSONDecoder(object_pairs_hook=collections.OrderedDict).decode(data)
-    return json_data
+    return get_snapshot().vendors
 
 
 def catalog_data():
-    chunks = int(uwsgi.cache_get('chunks-data', 'cache_chunks'))
-    if chunks == 0:
-        return None
-    data = ''
+    return get_snapshot().catalog
+
+
+def get_records():
+    """Get module records of the current cache generation. Records are opened
+    again only if the generation changed. Must be called with lock held.
+            :return RecordStore of the current cache generation
+    """
+    global records
+    current = get_snapshot()
+    while records is None or records.generation != current.generation:
+        try:
+            records = RecordStore(records_dir, current.generation)
+        except (IOError, OSError):
+            # generation was freed in the meantime
+            previous = current
+            current = get_snapshot()
+            if previous.generation == current.generation:
+                raise
+    if records.deltas != current.deltas:
+        changed = {}
+        for key, module in current.changed.items():
+            if module is not None:
+                module = json.dumps(module)
+            changed[module_record_key(*key)] = module
+        records = records.derive(current.deltas, changed)
+    return records
+
+
+def module_record_key(name, revision, organization):
+    return '{}@{}/{}'.format(name, revision, organization)
+
+
+def set_chunks(generation, key, value, size, cache):
+    """Save value to uwsgi cache under the key of given cache generation. Value
+    is split to chunks of given size and number of chunks is saved to
+    cache_chunks.
+            Arguments:
+                :param generation: (str) cache generation
+                :param key: (str) key of the value
+                :param value: (str) value to save
+                :param size: (int) maximal size of one chunk
+                :param cache: (str) uwsgi cache where chunks are saved
+                :return number of chunks
+    """
+    key = '{}/{}'.format(generation, key)
+    chunks = int(math.ceil(len(value) / float(size)))
     for i in range(0, chunks, 1):
-        data += uwsgi.cache_get('data{}'.format(i), 'main_cache')
-    json_data = \
-        json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-            .decode(data)
-    return json_data
+        uwsgi.cache_update('{}-{}'.format(key, i), value[i * size: (i + 1) * size],
+                           0, cache)
+    uwsgi.cache_update(key, repr(chunks), 0, 'cache_chunks')
+    return chunks
 
 
-def load(on_change):
-    """Load all the data populated to yang-catalog to memory saved in file in ./cache."""
-    with lock:
-        response = 'work'
-        data = ''
-        initialized = uwsgi.cache_get('initialized', 'cache_chunks')
-        LOGGER.debug('initialized {} on change {}'.format(initialized, on_change))
-        if initialized is None or initialized == 'False' or on_change:
-            uwsgi.cache_clear()
-            uwsgi.cache_set('initialized', 'False', 0, 'cache_chunks')
-            response = make_cache(credentials, response, is_uwsgi=is_uwsgi)
-
-            chunks = int(uwsgi.cache_get('chunks-data', 'cache_chunks'))
-            for i in range(0, chunks, 1):
-                data += uwsgi.cache_get('data{}'.format(i), 'main_cache')
-            cat = \
-            json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
-                .decode(data)['yang-catalog:catalog']
-            modules = cat['modules']
-            if cat.get('vendors'):
-                vendors = cat['vendors']
-            else:
-                vendors = {}
-            if len(modules) != 0:
-                for i, mod in enumerate(modules['module']):
-                    key = mod['name'] + '@' + mod['revision'] + '/' + mod[
-                        'organization']
-                    value = json.dumps(mod)
-                    chunks = int(math.ceil(len(value) / float(20000)))
-                    uwsgi.cache_set(key, repr(chunks), 0, 'cache_chunks')
-                    for j in range(0, chunks, 1):
-                        uwsgi.cache_set(key + '-{}'.format(j),
-                                        value[i * 20000: (i + 1) * 20000], 0,
-                                        'cache_modules')
-
-            chunks = int(math.ceil(len(json.dumps(modules)) / float(64000)))
-            for i in range(0, chunks, 1):
-                uwsgi.cache_set('modules-data{}'.format(i),
-                                json.dumps(modules)[i * 64000: (i + 1) * 64000],
-                                0, 'main_cache')
-            LOGGER.info(
-                'all {} modules chunks are set in uwsgi cache'.format(chunks))
-            uwsgi.cache_set('chunks-modules', repr(chunks), 0, 'cache_chunks')
-
-            chunks = int(math.ceil(len(json.dumps(vendors)) / float(64000)))
-            for i in range(0, chunks, 1):
-                uwsgi.cache_set('vendors-data{}'.format(i),
-                                json.dumps(vendors)[i * 64000: (i + 1) * 64000],
-                                0, 'main_cache')
-            LOGGER.info(
-                'all {} vendors chunks are set in uwsgi cache'.format(chunks))
-            uwsgi.cache_set('chunks-vendor', repr(chunks), 0, 'cache_chunks')
-        if response != 'work':
-            LOGGER.error('Could not load or create cache')
-            sys.exit(500)
-        uwsgi.cache_update('initialized', 'True', 0, 'cache_chunks')
+def get_chunks(generation, key, cache):
+    """Get value saved with set_chunks.
+            Arguments:
+                :param generation: (str) cache generation
+                :param key: (str) key of the value
+                :param cache: (str) uwsgi cache where chunks are saved
+                :return value or None if any part of it is missing
+    """
+    key = '{}/{}'.format(generation, key)
+    chunks = uwsgi.cache_get(key, 'cache_chunks')
+    if chunks is None:
+        return None
+    data = []
+    for i in range(0, int(chunks), 1):
+        chunk = uwsgi.cache_get('{}-{}'.format(key, i), cache)
+        if chunk is None:
+            return None
+        data.append(chunk)
+    return ''.join(data)
 
-        LOGGER.debug('Data loaded into memory successfully')
+
+def delete_chunks(generation, key, cache):
+    """Delete value saved with set_chunks.
+            Arguments:
+                :param generation: (str) cache generation
+                :param key: (str) key of the value
+                :param cache: (str) uwsgi cache where chunks are saved
+    """
+    key = '{}/{}'.format(generation, key)
+    chunks = uwsgi.cache_get(key, 'cache_chunks')
+    if chunks is None:
+        return
+    uwsgi.cache_del(key, 'cache_chunks')
+    for i in range(0, int(chunks), 1):
+        uwsgi.cache_del('{}-{}'.format(key, i), cache)
 
 
-def process(data, passed_data, value, module, split, count):
-    """Iterates recursively through the data to find only modules
-    that are searched for
+def get_published(key, cache):
+    """Get value of the published cache generation. If the generation is freed
+    while reading, value is read again from the generation that replaced it.
             Arguments:
-                :param data: (dict) module that is searched
-                :param passed_data: (list) data that contain value searched
-                    for are saved in this variable
-                :param value: (str) value searched for
-                :param module: (dict) module that is searched
-                :param split: (str) key value that conatins value searched for
-                :param count: (int) if split contains '/' then we need to know
-                    which part of the path are we searching.
+                :param key: (str) key of the value
+                :param cache: (str) uwsgi cache where chunks are saved
+                :return tuple of generation and value. Value is None if it
+                    does not exist
     """
-    if isinstance(data, unicode):
-        if data == value:
-            passed_data.append(module)
-            return True
-    elif isinstance(data, list):
-        for part in data:
-            if process(part, passed_data, value, module, split, count):
-                break
-    elif isinstance(data, dict):
-        if data:
-            count += 1
-            return process(data.get(split[count]), passed_data, value, module, split, count)
-    return False
+    generation = uwsgi.cache_get('generation', 'cache_chunks')
+    while True:
+        data = get_chunks(generation, key, cache)
+        latest = uwsgi.cache_get('generation', 'cache_chunks')
+        if data is not None or latest == generation:
+            return generation, data
+        generation = latest
+
+
+def publish_delta(generation, delta):
+    """Publish delta of the cache generation. Deltas are numbered in the order
+    they are published and every worker applies them in this order. Number of
+    the delta is claimed first so concurrent deltas never get the same one.
+            Arguments:
+                :param generation: (str) cache generation the delta belongs to
+                :param delta: (dict) modules added or changed, keys of modules
+                    deleted and vendor subtrees changed
+                :return number of the delta
+    """
+    i = 0
+    while not uwsgi.cache_set('{}/delta-{}/claim'.format(generation, i), 'True', 0,
+                              'cache_chunks'):
+        i += 1
+    set_chunks(generation, 'delta-{}'.format(i), json.dumps(delta), 64000, 'main_cache')
+    LOGGER.info('Delta {} of cache generation {} is set'.format(i, generation))
+    return i
+
+
+def free_generation(generation):
+    """Delete catalog, deltas and module records of given cache generation.
+            Arguments:
+                :param generation: (str) cache generation to delete
+    """
+    i = 0
+    while uwsgi.cache_exists('{}/delta-{}/claim'.format(generation, i), 'cache_chunks'):
+        delete_chunks(generation, 'delta-{}'.format(i), 'main_cache')
+        uwsgi.cache_del('{}/delta-{}/claim'.format(generation, i), 'cache_chunks')
+        i += 1
+    delete_chunks(generation, 'data', 'main_cache')
+    RecordStore.remove(records_dir, generation)
+    LOGGER.info('Cache generation {} is freed'.format(generation))
+
+
+def build_generation(generation):
+    """Load all the data populated to yang-catalog to uwsgi cache under keys of
+    a new cache generation. The generation is published with a single update
+    of the generation pointer once all of its keys are saved, so readers never
+    see a partially loaded catalog. Module records are saved to a RecordStore
+    of the generation. Keys and records of the replaced generation are freed
+    afterwards.
+            Arguments:
+                :param generation: (str) new cache generation
+                :return True if the new generation was published
+    """
+    global snapshot
+    response = make_cache(credentials, 'work', is_uwsgi=is_uwsgi,
+                          generation=generation)
+    data = get_chunks(generation, 'data', 'main_cache')
+    if response != 'work' or data is None:
+        LOGGER.error('Could not load or create cache')
+        free_generation(generation)
+        return False
+    current = Snapshot(generation, data)
+    RecordStore.write(records_dir, generation,
+                      ((module_record_key(mod['name'], mod['revision'],
+                                          mod['organization']), json.dumps(mod))
+                       for mod in current.modules.get('module', [])),
+                      compress=compress_records)
+    with lock:
+        replaced = uwsgi.cache_get('generation', 'cache_chunks')
+        uwsgi.cache_update('generation', generation, 0, 'cache_chunks')
+        snapshot = current
+    uwsgi.cache_update('initialized', 'True', 0, 'cache_chunks')
+    LOGGER.info('Cache generation {} is set'.format(generation))
+    if replaced is not None and replaced != generation:
+        free_generation(replaced)
+    return True
+
+
+def load(on_change):
+    """Load all the data populated to yang-catalog to memory if it is not
+    loaded yet or if on_change is set.
+            Arguments:
+                :param on_change: (bool) reload data even if they are loaded
+    """
+    initialized = uwsgi.cache_get('initialized', 'cache_chunks')
+    LOGGER.debug('initialized {} on change {}'.format(initialized, on_change))
+    if initialized == 'True' and not on_change:
+        return
+    with reload_lock:
+        initialized = uwsgi.cache_get('initialized', 'cache_chunks')
+        if initialized == 'True' and not on_change:
+            return
+        if not build_generation(uuid.uuid4().hex):
+            sys.exit(500)
+        LOGGER.debug('Data loaded into memory successfully')
 
 
 @auth.hash_password
@@ -2152,40 +2180,32 @@ def get_password(username):
                 :param username: (str) username privided via API
                 :return hashed password
     """
-    try:
-        db = MySQLdb.connect(host=dbHost, db=dbName, user=dbUser, passwd=dbPass)
-        # prepare a cursor object using cursor() method
-        cursor = db.cursor()
-
-        # execute SQL query using execute() method.
-        cursor.execute("SELECT * FROM `users`")
-
-        data = cursor.fetchall()
-
-        for row in data:
-            if username in row[1]:
-                return row[2]
-        db.close()
-        return None
-    # print row
-
-    except MySQLdb.MySQLError as err:
-        LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+    return users_db.get_password(username)
 
 
 @auth.error_handler
 def unauthorized():
-    """Return unathorized error message"""
+    """Return unathorized error message. Cached user is dropped so changed
+    password or access rights are read from the database on the next try.
+    """
+    if request.authorization is not None:
+        users_db.invalidate(request.authorization['username'])
     return make_response(jsonify({'error': 'Unauthorized access'}), 401)
 
 
-def runit(env, start_response):
+def create_app():
+    """Initialize the api once per worker. Configuration is read, connections
+    to the receiver queue and to the database are opened and the catalog is
+    loaded. All of them are reused by the requests served by the worker.
+            :return Flask application
+    """
     parser = argparse.ArgumentParser()
     parser.add_argument('--config-path', type=str,
                         default='../utility/config.ini',
                         help='Set path to config file')
     LOGGER.info('Loading all configuration')
-    args = parser.parse_args()
+    # uwsgi may pass its own arguments
+    args, _ = parser.parse_known_args()
     config_path = os.path.abspath('.') + '/' + args.config_path
     config = ConfigParser.ConfigParser()
     config.read(config_path)
@@ -2201,6 +2221,10 @@ def runit(env, start_response):
     dbUser = config.get('API-Section', 'dbUser')
     global dbPass
     dbPass = config.get('API-Section', 'dbPassword')
+    global users_db
+    users_db = UsersDb(dbHost, dbName, dbUser, dbPass)
+    httpClient.configure(int(config.get('General-Section', 'http-pool-size')),
+                         float(config.get('General-Section', 'http-timeout')))
     global credentials
     credentials = config.get('General-Section', 'credentials').split(' ')
     global confd_ip
@@ -2222,8 +2246,6 @@ def runit(env, start_response):
     global integrity_file_location
     integrity_file_location = config.get('API-Section',
                                          'integrity-file-location')
-    global diff_file_dir
-    diff_file_dir = config.get('API-Section', 'save-diff-dir')
     global log
     ip = config.get('API-Section', 'ip')
     global api_port
@@ -2233,6 +2255,8 @@ def runit(env, start_response):
     api_protocol = config.get('General-Section', 'protocol-api')
     global is_uwsgi
     is_uwsgi = config.get('General-Section', 'uwsgi')
+    global compress_records
+    compress_records = config.get('API-Section', 'compress-records') == 'True'
     load(False)
     global yangcatalog_api_prefix
     separator = ':'
@@ -2247,4 +2271,16 @@ def runit(env, start_response):
     yangcatalog_api_prefix = '{}://{}{}{}/'.format(api_protocol, local_ip,
                                                    separator, suffix)
     LOGGER.debug('Starting api')
-    return app(env, start_response)
+    return app
+
+
+def runit(env, start_response):
+    """uwsgi entry point. Api is initialized by the first request the worker
+    gets, all the requests are only dispatched to the application.
+    """
+    global application
+    if application is None:
+        with init_lock:
+            if application is None:
+                application = create_app()
+    return application(env, start_response)
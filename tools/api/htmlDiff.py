@@ -0,0 +1,37 @@
+import difflib
+import hashlib
+
+from tools.utility.lruCache import LRUCache
+
+
+class HtmlDiff:
+    """Side by side html diff of two texts computed in process. Rendered diffs
+    are cached under the hashes of both texts.
+    """
+
+    def __init__(self, max_size=200, wrap_column=80):
+        """
+                Arguments:
+                    :param max_size: (int) maximal number of diffs kept in memory
+                    :param wrap_column: (int) column where long lines are wrapped
+        """
+        self.__cache = LRUCache(max_size)
+        self.__wrap_column = wrap_column
+
+    def diff(self, text1, text2, description1='', description2=''):
+        """Create html page with side by side diff of the texts
+                Arguments:
+                    :param text1: (str) older text
+                    :param text2: (str) newer text
+                    :param description1: (str) header of the older text column
+                    :param description2: (str) header of the newer text column
+                    :return html page
+        """
+        key = (hashlib.sha1(text1).hexdigest(), hashlib.sha1(text2).hexdigest(),
+               description1, description2)
+        html = self.__cache.get(key)
+        if html is None:
+            html = difflib.HtmlDiff(wrapcolumn=self.__wrap_column) \
+                .make_file(text1.splitlines(), text2.splitlines(), description1, description2)
+            self.__cache.set(key, html)
+        return html
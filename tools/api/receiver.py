@@ -1,25 +1,25 @@
 import ConfigParser
 import argparse
-import base64
 import errno
 import json
 import os
 import shutil
 import subprocess
 import sys
-import urllib2
+import time
 from Crypto.Hash import SHA, HMAC
 from datetime import datetime
-from urllib2 import URLError
 
 import pika
 import requests
 
 import tools.utility.log as log
-from tools.utility import messageFactory
+from tools.utility import httpClient, messageFactory
 from tools.utility.util import get_curr_dir
 
 LOGGER = log.get_logger('receiver')
+# number of times update is sent again when the api cache was reloaded meanwhile
+UPDATE_CACHE_ATTEMPTS = 5
 
 
 # Make a http request on path with json_data
@@ -40,25 +40,18 @@ def http_request(path, method, json_data, http_credentials, header,
             :param path : (str) Path of the request.
             :return a response from the request.
     """
+    headers = {'Content-Type': header, 'Accept': header}
+    if indexing:
+        headers['X-YC-Signature'] = 'sha1={}'.format(indexing)
+    response = httpClient.request(method, path, data=json_data, headers=headers,
+                                  auth=(http_credentials[0], http_credentials[1]))
     try:
-        opener = urllib2.build_opener(urllib2.HTTPHandler)
-        request = urllib2.Request(path, data=json_data)
-        request.add_header('Content-Type', header)
-        request.add_header('Accept', header)
-        if indexing:
-            request.add_header('X-YC-Signature', 'sha1={}'.format(indexing))
-        base64string = base64.b64encode('%s:%s' % (http_credentials[0], http_credentials[1]))
-        request.add_header("Authorization", "Basic %s" % base64string)
-        request.get_method = lambda: method
-        return opener.open(request)
-    except urllib2.HTTPError as e:
+        response.raise_for_status()
+    except requests.HTTPError as e:
         LOGGER.debug('Could not send request with body ' + repr(json_data) + ' and path ' + path)
-        if return_code:
-            return e
-        else:
+        if not return_code:
             raise e
-    except URLError as e:
-        raise e
+    return response
 
 
 def process_sdo(arguments):
@@ -106,6 +99,8 @@ def process_sdo(arguments):
                   'r') as f:
             global all_modules
             all_modules = json.load(f)
+        global cache_delta
+        cache_delta = {'modules-to-update': module_keys(all_modules['module'])}
         if notify_indexing:
             send_to_indexing(yangcatalog_api_prefix,
                              direc + '/prepare.json', [arguments[11],
@@ -166,9 +161,9 @@ def send_to_indexing(yc_api_prefix, modules_to_index, credentials, apiIp = None,
                                                          revision)
             data = {'input': {'dependents': [{'name': name}]}}
 
-            response = requests.post(yc_api_prefix + 'search-filter',
-                                     auth=(credentials[0], credentials[1]),
-                                     json={'input': data})
+            response = httpClient.post(yc_api_prefix + 'search-filter',
+                                       auth=(credentials[0], credentials[1]),
+                                       json={'input': data})
             if response.status_code == 201:
                 modules = json.loads(response.content)
                 for mod in modules:
@@ -180,14 +175,18 @@ def send_to_indexing(yc_api_prefix, modules_to_index, credentials, apiIp = None,
                                                            confd_ip,
                                                            confdPort, m_name,
                                                            m_rev, m_org, name))
-                    requests.delete(url, auth=(credentials[0], credentials[1]),
-                                    headers={'Content-Type': 'application/vnd.yang.data+json'})
+                    httpClient.delete(url, auth=(credentials[0], credentials[1]),
+                                      headers={'Content-Type': 'application/vnd.yang.data+json'})
             if os.path.exists(path_to_delete_local):
                 os.remove(path_to_delete_local)
     else:
         with open(modules_to_index, 'r') as f:
             sdos_json = json.load(f)
         post_body = {}
+        missing = set()
+        if not force_indexing:
+            missing = find_missing_modules(yc_api_prefix, sdos_json['module'],
+                                           credentials)
         if from_api:
             if sdo_type:
                 prefix = 'api/sdo/'
@@ -195,43 +194,24 @@ def send_to_indexing(yc_api_prefix, modules_to_index, credentials, apiIp = None,
                 prefix = 'api/vendor/'
 
             for module in sdos_json['module']:
-                response = http_request('{}search/modules/{},{},{}'
-                                        .format(yc_api_prefix,
-                                                module['name'],
-                                                module['revision'],
-                                                module['organization']), 'GET',
-                                        '',
-                                        credentials,
-                                        'application/vnd.yang.data+json',
-                                        return_code=True)
-                code = response.code
-                if force_indexing or (code != 200 and code != 201 and code != 204):
+                key = module['name'] + '@' + module['revision'] + '/' + module['organization']
+                if force_indexing or key in missing:
                     if module.get('schema'):
                         path = prefix + module['schema'].split('githubusercontent.com/')[1]
                         path = os.path.abspath(get_curr_dir(__file__) + '/../../' + path)
                     else:
                         path = 'module does not exist'
-                    post_body[module['name'] + '@' + module['revision'] + '/' + module['organization']] = path
+                    post_body[key] = path
         else:
             for module in sdos_json['module']:
-                response = http_request('{}search/modules/{},{},{}'
-                                        .format(yc_api_prefix,
-                                                module['name'],
-                                                module['revision'],
-                                                module['organization']), 'GET',
-                                        '',
-                                        credentials,
-                                        'application/vnd.yang.data+json',
-                                        return_code=True)
-                code = response.code
-                if force_indexing or (
-                            code != 200 and code != 201 and code != 204):
+                key = module['name'] + '@' + module['revision'] + '/' + module['organization']
+                if force_indexing or key in missing:
                     if module.get('schema'):
                         path = module['schema'].split('master')[1]
                         path = os.path.abspath(get_curr_dir(__file__) + '/../../' + path)
                     else:
                         path = 'module does not exist'
-                    post_body[module['name'] + '@' + module['revision'] + '/' + module['organization']] = path
+                    post_body[key] = path
         body_to_send = json.dumps({'modules-to-index': post_body}, indent=4)
         #if len(post_body) > 0:
         #    mf.send_added_new_yang_files(body_to_send)
@@ -248,14 +228,36 @@ def send_to_indexing(yc_api_prefix, modules_to_index, credentials, apiIp = None,
         #             'POST', body_to_send,
         #             credentials, 'application/json',
         #             indexing=create_signature(set_key, body_to_send))
-    except urllib2.HTTPError as e:
+    except requests.HTTPError as e:
         LOGGER.error('could not send data for indexing. Reason: {}'
-                     .format(e.msg))
-    except URLError as e:
+                     .format(e.message))
+    except requests.ConnectionError as e:
         LOGGER.error('could not send data for indexing. Reason: {}'
                      .format(repr(e.message)))
 
 
+def find_missing_modules(yc_api_prefix, modules, credentials):
+    """Find out which modules are not in yang-catalog yet. All the modules are
+    looked up with a single request.
+            Arguments:
+                :param yc_api_prefix: (str) prefix for sending request to api
+                :param modules: (list) modules containing name, revision and organization
+                :param credentials: (list) Basic authorization credentials - username, password
+                    respectively.
+                :return set of name@revision/organization of the modules that
+                    are not in yang-catalog
+    """
+    body = json.dumps({'input': {'module': [{'name': module['name'],
+                                             'revision': module['revision'],
+                                             'organization': module['organization']}
+                                            for module in modules]}})
+    response = http_request(yc_api_prefix + 'search/modules?fields=name', 'POST',
+                            body, credentials, 'application/json')
+    missing = json.loads(response.content)['missing']
+    return set(module['name'] + '@' + module['revision'] + '/' + module['organization']
+               for module in missing)
+
+
 def process_vendor(arguments):
     """Processes vendors. Calls populate script which calls script to parse all
     the modules that are contained in the given hello message xml file or in
@@ -301,6 +303,9 @@ def process_vendor(arguments):
                   'r') as f:
             global all_modules
             all_modules = json.load(f)
+        global cache_delta
+        cache_delta = {'modules-to-update': module_keys(all_modules['module']),
+                       'vendors': vendor_paths(all_modules['module'])}
         if notify_indexing:
             send_to_indexing(yangcatalog_api_prefix,
                              direc + '/prepare.json', [arguments[9],
@@ -350,7 +355,7 @@ def process_vendor_deletion(arguments):
     modules_that_succeeded = []
     iterate_in_depth(vendors_data, modules)
 
-    response = requests.delete(path_to_delete, auth=(credentials[0], credentials[1]))
+    response = httpClient.delete(path_to_delete, auth=(credentials[0], credentials[1]))
     if response.status_code == 404:
         pass
         #return __response_type[0] + '#split#not found'
@@ -360,7 +365,7 @@ def process_vendor_deletion(arguments):
             path = protocol + '://' + confd_ip + ':' + repr(confdPort) + '/api/config/catalog/modules/module/' \
                    + mod
             modules_data = json.loads(http_request(path + '?deep', 'GET', '', credentials,
-                                                   'application/vnd.yang.data+json').read())
+                                                   'application/vnd.yang.data+json').content)
             implementations = modules_data['yang-catalog:module']['implementations']['implementation']
             count_of_implementations = len(implementations)
             count_deleted = 0
@@ -384,7 +389,7 @@ def process_vendor_deletion(arguments):
                     imp_key += ',' + imp['software-flavor']
 
                 url = path + '/implementations/implementation/' + imp_key
-                response = requests.delete(url, auth=(credentials[0], credentials[1]))
+                response = httpClient.delete(url, auth=(credentials[0], credentials[1]))
 
                 if response.status_code != 204:
                     LOGGER.error('Couldn\'t delete implementation of module on path {} because of error: {}'
@@ -396,7 +401,7 @@ def process_vendor_deletion(arguments):
                         count_of_implementations != 0):
                 name, revision, organization = mod.split(',')
                 if organization == vendor:
-                    response = requests.delete(path, auth=(credentials[0], credentials[1]))
+                    response = httpClient.delete(path, auth=(credentials[0], credentials[1]))
                     to_add = '{}@{}/{}'.format(name, revision, organization)
                     modules_that_succeeded.append(to_add)
                     if response.status_code != 204:
@@ -404,6 +409,16 @@ def process_vendor_deletion(arguments):
                         continue
         except:
             LOGGER.error('Yang file {} doesn\'t exist although it should exist'.format(mod))
+    global cache_delta
+    cache_delta = {'modules-to-update': [], 'modules-to-delete': [],
+                   'vendors': [path_to_delete.split('?')[0].split('/catalog/vendors/')[-1]]}
+    for mod in modules:
+        name, revision, organization = mod.split(',')
+        key = {'name': name, 'revision': revision, 'organization': organization}
+        if '{}@{}/{}'.format(name, revision, organization) in modules_that_succeeded:
+            cache_delta['modules-to-delete'].append(key)
+        else:
+            cache_delta['modules-to-update'].append(key)
     if notify_indexing:
         send_to_indexing(yangcatalog_api_prefix, modules_that_succeeded,
                          credentials, delete=True)
@@ -447,7 +462,7 @@ def make_cache(credentials, response):
     """
     path = yangcatalog_api_prefix + 'load-cache'
     try:
-        http_request(path, 'POST', '', credentials, 'application/vnd.yang.data+json').read()
+        http_request(path, 'POST', '', credentials, 'application/vnd.yang.data+json').content
     except:
         e = sys.exc_info()[0]
         LOGGER.error('Could not load json to memory-cache. Error: {}'.format(e))
@@ -455,6 +470,66 @@ def make_cache(credentials, response):
     return response
 
 
+def update_cache(credentials, response, delta):
+    """After we delete or add some modules we send only the modules and
+    vendors that changed to the api which applies them to its cache.
+            Arguments:
+                :param response: (str) Contains string 'work' which will be sent back if
+                    everything went through fine
+                :param credentials: (list) Basic authorization credentials - username, password
+                    respectively
+                :param delta: (dict) modules-to-update and modules-to-delete lists of modules
+                    with name, revision and organization and vendors list of paths in
+                    vendors tree that changed
+                :return 'work' if everything went through fine otherwise send back the reason why
+                    it failed.
+    """
+    path = yangcatalog_api_prefix + 'update-cache'
+    try:
+        for attempt in range(UPDATE_CACHE_ATTEMPTS):
+            result = http_request(path, 'POST', json.dumps({'input': delta}), credentials,
+                                  'application/json', return_code=True)
+            # api refuses the update while its cache is being reloaded
+            if result.status_code != 409:
+                result.raise_for_status()
+                return response
+            LOGGER.info('Cache was reloaded while it was updated. Trying again')
+            time.sleep(10)
+    except:
+        e = sys.exc_info()[0]
+        LOGGER.error('Could not update memory-cache. Error: {}'.format(e))
+        return __response_type[0] + '#split#Server error - updating memory'
+    LOGGER.warning('Could not update memory-cache. Reloading it whole')
+    return make_cache(credentials, response)
+
+
+def module_keys(modules):
+    """Get keys of the modules to send to the api
+            Arguments:
+                :param modules: (list) modules
+                :return list of name, revision and organization of every module
+    """
+    return [{'name': mod['name'], 'revision': mod['revision'],
+             'organization': mod['organization']} for mod in modules]
+
+
+def vendor_paths(modules):
+    """Get paths in vendors tree of all the implementations of the modules
+            Arguments:
+                :param modules: (list) modules
+                :return list of paths to software flavors
+    """
+    paths = set()
+    for mod in modules:
+        implementations = mod.get('implementations') or {}
+        for imp in implementations.get('implementation', []):
+            paths.add('vendor/{}/platforms/platform/{}/software-versions/software-version/{}'
+                      '/software-flavors/software-flavor/{}'
+                      .format(imp['vendor'], imp['platform'], imp['software-version'],
+                              imp['software-flavor']))
+    return sorted(paths)
+
+
 def process_module_deletion(arguments):
     """Deletes module. It calls the delete request to confd to delete module on
     given path. This will delete whole module in modules branch of the
@@ -469,12 +544,15 @@ def process_module_deletion(arguments):
     credentials = arguments[3:5]
     path_to_delete = arguments[5]
 
-    response = requests.delete(path_to_delete, auth=(credentials[0], credentials[1]))
+    response = httpClient.delete(path_to_delete, auth=(credentials[0], credentials[1]))
     if response.status_code != 204:
         LOGGER.error('Couldn\'t delete module on path {}. Error : {}'
                      .format(path_to_delete, response.content))
         return __response_type[0] + '#split#' + response.content
     name, revision, organization = path_to_delete.split('/')[-1].split(',')
+    global cache_delta
+    cache_delta = {'modules-to-delete': [{'name': name, 'revision': revision,
+                                          'organization': organization}]}
     if notify_indexing:
         send_to_indexing(yangcatalog_api_prefix,
                          ['{}@{}/{}'.format(name, revision, organization)],
@@ -514,6 +592,8 @@ def on_request(ch, method, props, body):
         arguments = body.split('#')
         global all_modules
         all_modules = None
+        global cache_delta
+        cache_delta = None
         if arguments[-3] == 'DELETE':
             if 'http' in arguments[0]:
                 final_response = process_module_deletion(arguments)
@@ -532,7 +612,11 @@ def on_request(ch, method, props, body):
             direc = '/'.join(arguments[5].split('/')[0:3])
             shutil.rmtree(direc)
         if final_response.split('#split#')[0] == __response_type[1]:
-            final_response = make_cache(credentials, final_response)
+            if cache_delta is None:
+                final_response = make_cache(credentials, final_response)
+            else:
+                final_response = update_cache(credentials, final_response,
+                                              cache_delta)
 
             if all_modules:
                 prefix = '{}://{}:{}'.format(confd_protocol, confd_ip,
@@ -543,10 +627,10 @@ def on_request(ch, method, props, body):
                         'Searching semver for {}'.format(module['name']))
                     url = '{}search/name/{}'.format(yangcatalog_api_prefix,
                                                     module['name'])
-                    response = requests.get(url, auth=(
-                                            credentials[0], credentials[1]),
-                                            headers={
-                                                'Accept': 'application/json'})
+                    response = httpClient.get(url, auth=(
+                                              credentials[0], credentials[1]),
+                                              headers={
+                                                  'Accept': 'application/json'})
                     if response.status_code == 404:
                         module['derived-semantic-version'] = '1.0.0'
                         new_modules.append(module)
@@ -683,7 +767,7 @@ def on_request(ch, method, props, body):
                             mod['revision'] = modules[0]['revision']
                             mod['organization'] = modules[0]['organization']
                             modules[0]['semver'] = '1.0.0'
-                            response = requests.get(
+                            response = httpClient.get(
                                 '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                     protocol, confd_ip, confdPort,
                                     mod['name'], mod['revision'],
@@ -708,7 +792,7 @@ def on_request(ch, method, props, body):
                                     upgraded_version = '{}.{}.{}'.format(ver, 0,
                                                                          0)
                                     modules[x]['semver'] = upgraded_version
-                                    response = requests.get(
+                                    response = httpClient.get(
                                         '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                             protocol, confd_ip, confdPort,
                                             mod['name'], mod['revision'],
@@ -730,7 +814,7 @@ def on_request(ch, method, props, body):
                                         upgraded_version = '{}.{}.{}'.format(
                                             ver, 0, 0)
                                         modules[x]['semver'] = upgraded_version
-                                        response = requests.get(
+                                        response = httpClient.get(
                                             '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                                 protocol, confd_ip, confdPort,
                                                 mod['name'], mod['revision'],
@@ -784,7 +868,7 @@ def on_request(ch, method, props, body):
                                                 versions[0], versions[1], ver)
                                             modules[x][
                                                 'semver'] = upgraded_version
-                                            response = requests.get(
+                                            response = httpClient.get(
                                                 '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                                     protocol, confd_ip,
                                                     confdPort,
@@ -809,7 +893,7 @@ def on_request(ch, method, props, body):
                                                 versions[0], ver, 0)
                                             modules[x][
                                                 'semver'] = upgraded_version
-                                            response = requests.get(
+                                            response = httpClient.get(
                                                 '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                                     protocol, confd_ip,
                                                     confdPort,
@@ -833,7 +917,7 @@ def on_request(ch, method, props, body):
                                         upgraded_version = '{}.{}.{}'.format(
                                             ver, 0, 0)
                                         modules[x]['semver'] = upgraded_version
-                                        response = requests.get(
+                                        response = httpClient.get(
                                             '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                                 protocol, confd_ip,
                                                 confdPort,
@@ -857,8 +941,8 @@ def on_request(ch, method, props, body):
                                       'revision': new_dep['revision']}
                         else:
                             search = {'name': new_dep['name']}
-                        response = requests.post(yangcatalog_api_prefix
-                                                 + 'search-filter',
+                        response = httpClient.post(yangcatalog_api_prefix
+                                                   + 'search-filter',
                             auth=(credentials[0], credentials[1]),
                             json={'input': search})
                         if response.status_code == 200:
@@ -875,8 +959,8 @@ def on_request(ch, method, props, body):
                                     m['dependents'].append(new)
                                     new_modules.append(m)
 
-                    response = requests.post(yangcatalog_api_prefix
-                                             + 'search-filter',
+                    response = httpClient.post(yangcatalog_api_prefix
+                                               + 'search-filter',
                         auth=(
                             credentials[0], credentials[1]),
                         json={'input': {'dependencies': [{'name': name}]}})
@@ -920,6 +1004,10 @@ def on_request(ch, method, props, body):
                     http_request(prefix + '/api/config/catalog/modules/', 'PATCH',
                                  json_modules_data, credentials,
                                  'application/vnd.yang.data+json')
+                if len(new_modules) > 0:
+                    final_response = update_cache(
+                        credentials, final_response,
+                        {'modules-to-update': module_keys(new_modules)})
 
     LOGGER.info('Receiver is done with id - {} and message = {}'
                 .format(props.correlation_id, str(final_response)))
@@ -972,6 +1060,8 @@ if __name__ == '__main__':
     save_file_dir = config.get('Receiver-Section', 'save-file-dir')
     global is_uwsgi
     is_uwsgi = config.get('General-Section', 'uwsgi')
+    httpClient.configure(int(config.get('General-Section', 'http-pool-size')),
+                         float(config.get('General-Section', 'http-timeout')))
     if notify_indexing == 'True':
         notify_indexing = True
     else:
@@ -0,0 +1,121 @@
+import copy
+import errno
+import json
+import mmap
+import os
+import zlib
+
+import tools.utility.log as log
+
+LOGGER = log.get_logger(__name__)
+
+
+class RecordStore:
+    """Serialized module records of one cache generation. Records are saved
+    one after another in a single file that every worker maps to memory, so
+    all the workers share one copy of it. Offsets of the records are saved
+    in an index file next to it. Record of a module is read with a single
+    slice of the mapped file and sent as it is without decoding. Records
+    changed by the deltas of the generation are kept in memory on top of them.
+    """
+
+    def __init__(self, directory, generation):
+        """Open records of the generation saved with write
+                Arguments:
+                    :param directory: (str) directory where records are saved
+                    :param generation: (str) cache generation of the records
+        """
+        self.generation = generation
+        self.deltas = 0
+        self.__changed = {}
+        records_file, index_file = RecordStore.__paths(directory, generation)
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+        self.__compressed = index['compressed']
+        self.__offsets = index['records']
+        with open(records_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self.__data = ''
+            else:
+                self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, key):
+        """Get serialized record of the module
+                Arguments:
+                    :param key: (str) name@revision/organization of the module
+                    :return json of the module or None if there is no such module
+        """
+        if key in self.__changed:
+            return self.__changed[key]
+        offset = self.__offsets.get(key)
+        if offset is None:
+            return None
+        record = self.__data[offset[0]:offset[0] + offset[1]]
+        if self.__compressed:
+            record = zlib.decompress(record)
+        return record
+
+    def derive(self, deltas, changed):
+        """Create records with the records changed by deltas on top of the
+        saved ones. Mapped file is shared with these records.
+                Arguments:
+                    :param deltas: (int) number of the deltas applied
+                    :param changed: (dict) json of all the modules changed by the
+                        deltas by their key, None for the deleted modules
+                    :return new RecordStore
+        """
+        derived = copy.copy(self)
+        derived.deltas = deltas
+        derived.__changed = changed
+        return derived
+
+    @staticmethod
+    def write(directory, generation, records, compress=False):
+        """Save records of the generation. Index is saved last so records can
+        not be opened before they are complete.
+                Arguments:
+                    :param directory: (str) directory where records are saved
+                    :param generation: (str) cache generation of the records
+                    :param records: (iterable) tuples of module key and json of the module
+                    :param compress: (bool) whether records are compressed with zlib
+        """
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            # be happy if someone already created the path
+            if e.errno != errno.EEXIST:
+                raise
+        records_file, index_file = RecordStore.__paths(directory, generation)
+        offsets = {}
+        offset = 0
+        with open(records_file, 'wb') as f:
+            for key, record in records:
+                if compress:
+                    record = zlib.compress(record, 1)
+                f.write(record)
+                offsets[key] = (offset, len(record))
+                offset += len(record)
+        with open(index_file + '.tmp', 'w') as f:
+            json.dump({'compressed': compress, 'records': offsets}, f)
+        os.rename(index_file + '.tmp', index_file)
+        LOGGER.info('{} module records of generation {} saved'.format(len(offsets), generation))
+
+    @staticmethod
+    def remove(directory, generation):
+        """Delete records of the generation. Workers that already mapped
+        the records can keep reading them until they close them.
+                Arguments:
+                    :param directory: (str) directory where records are saved
+                    :param generation: (str) cache generation of the records
+        """
+        for path in RecordStore.__paths(directory, generation):
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+    @staticmethod
+    def __paths(directory, generation):
+        return (os.path.join(directory, '{}.records'.format(generation)),
+                os.path.join(directory, '{}.index'.format(generation)))
@@ -1,5 +1,6 @@
 import datetime
 import uuid
+from threading import Lock
 
 import pika
 
@@ -13,14 +14,18 @@ class Sender:
         LOGGER.debug('Initializing sender')
         self.__response_type = ['Failed', 'In progress',
                                 'Finished successfully', 'does not exist']
+        self.__lock = Lock()
+        self.__connect()
+
+        self.__response_file = 'correlation_ids'
+
+    def __connect(self):
         self.connection = pika.BlockingConnection(
             pika.ConnectionParameters('127.0.0.1'))
 
         self.channel = self.connection.channel()
         self.channel.queue_declare(queue='module_queue')
 
-        self.__response_file = 'correlation_ids'
-
     def get_response(self, correlation_id):
         """Get response according to job_id. It can be either 
         'Failed', 'In progress', 'Finished successfully' or 'does not exist'
@@ -41,6 +46,14 @@ class Sender:
 
         return self.__response_type[3]
 
+    def __publish(self, corr_id, arguments):
+        self.channel.basic_publish(exchange='',
+                                   routing_key='module_queue',
+                                   properties=pika.BasicProperties(
+                                       correlation_id=corr_id,
+                                   ),
+                                   body=str(arguments))
+
     def send(self, arguments):
         """Send data to receiver queue to process
                 Arguments:
@@ -50,12 +63,15 @@ class Sender:
         LOGGER.info('Sending data to queue with arguments: {}'
                     .format(arguments))
         corr_id = str(uuid.uuid4())
-        self.channel.basic_publish(exchange='',
-                                   routing_key='module_queue',
-                                   properties=pika.BasicProperties(
-                                       correlation_id=corr_id,
-                                   ),
-                                   body=str(arguments))
+        # connection is shared by all the requests of the worker and it may
+        # have been closed by the broker since the last message was sent
+        with self.__lock:
+            try:
+                self.__publish(corr_id, arguments)
+            except pika.exceptions.AMQPError as e:
+                LOGGER.warning('Connection to the queue lost ({}), connecting again'.format(repr(e)))
+                self.__connect()
+                self.__publish(corr_id, arguments)
         with open(self.__response_file, 'a') as f:
             line = '{} -- {} - {}\n'.format(datetime.datetime.now().ctime(),
                                             corr_id, self.__response_type[1])
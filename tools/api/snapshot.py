@@ -0,0 +1,703 @@
+import collections
+import json
+
+import tools.utility.log as log
+
+LOGGER = log.get_logger(__name__)
+
+# Paths of the module leafs that can be searched with /search/<key>/<value>
+MODULE_KEYS = ['ietf/ietf-wg', 'maturity-level', 'document-name', 'author-email', 'compilation-status', 'namespace',
+               'conformance-type', 'module-type', 'organization', 'yang-version', 'name', 'revision', 'tree-type',
+               'belongs-to', 'generated-from']
+# Lists of a module that are filtered by name, revision and schema in /search-filter
+SUBLIST_LEAFS = ['dependencies', 'dependents', 'submodule']
+SUBLIST_FIELDS = ['name', 'revision', 'schema']
+# Leafs that are not compared as a whole in /search-filter
+COMPLEX_LEAFS = ['implementations', 'submodule', 'dependencies', 'dependents']
+# Leafs of an implementation that identify the platform implementing the module
+IMPLEMENTATION_KEYS = ['vendor', 'platform', 'software-version', 'software-flavor']
+# Leafs that identify entries of the lists in the vendors tree in confd paths.
+# Entries of the other lists are identified by their name
+VENDOR_LIST_KEYS = {'module': ['name', 'revision', 'organization'],
+                    'deviation': ['name', 'revision']}
+
+
+class Snapshot:
+    """Decoded yang-catalog data held in memory by a single api worker.
+    Snapshot belongs to exactly one cache generation and is never modified
+    once it is created. When the generation in uwsgi cache changes a new
+    snapshot is decoded and this one is thrown away. Deltas published for
+    the generation are applied with apply which creates a new snapshot that
+    shares all the unchanged data with this one.
+    """
+
+    def __init__(self, generation, data):
+        """Decode catalog json saved in uwsgi cache
+                Arguments:
+                    :param generation: (str) cache generation the data belongs to
+                    :param data: (str) whole catalog json as it was downloaded
+                        from confd
+        """
+        self.generation = generation
+        # number of deltas of the generation applied to this snapshot
+        self.deltas = 0
+        # modules changed by the deltas, None for the deleted ones
+        self.changed = {}
+        self.catalog = None
+        self.modules = {}
+        self.vendors = {}
+        if data:
+            self.catalog = json.JSONDecoder(object_pairs_hook=collections.OrderedDict) \
+                .decode(data)
+            cat = self.catalog['yang-catalog:catalog']
+            if cat.get('modules'):
+                self.modules = cat['modules']
+            if cat.get('vendors'):
+                self.vendors = cat['vendors']
+
+        self.__order = {}
+        self.__next_order = 0
+        self.__records = collections.OrderedDict()
+        self.__leaf_index = {}
+        self.__top_index = {}
+        self.__sub_index = {}
+        self.__present = {}
+        self.__implementation_index = {}
+        self.__latest_revision = {}
+        self.__latest_modules = None
+        self.__dependency_graph = {}
+        self.__vendor_lists = {}
+        for module in self.modules.get('module', []):
+            self.__add_module(module)
+        if data:
+            LOGGER.info('Snapshot of generation {} decoded with {} modules'
+                        .format(generation, len(self.modules.get('module', []))))
+
+    def apply(self, modules, deleted, vendors):
+        """Create new snapshot with a delta applied. Only the index entries of
+        the modules that changed are updated. Index entries shared with this
+        snapshot are copied before they are changed so this snapshot stays
+        untouched for the readers that still hold it.
+                Arguments:
+                    :param modules: (list) modules that were added or changed
+                    :param deleted: (list) keys of the modules that were deleted
+                    :param vendors: (list) tuples of path in vendors tree split by '/'
+                        and new content of the path or None if it was deleted
+                    :return new Snapshot
+        """
+        derived = Snapshot(self.generation, None)
+        derived.deltas = self.deltas + 1
+        derived.changed = dict(self.changed)
+        derived.__order = dict(self.__order)
+        derived.__next_order = self.__next_order
+        derived.__records = collections.OrderedDict(self.__records)
+        derived.__leaf_index = dict(self.__leaf_index)
+        derived.__top_index = dict((leaf, dict(index)) for leaf, index in self.__top_index.items())
+        derived.__sub_index = dict((leaf, dict(index)) for leaf, index in self.__sub_index.items())
+        derived.__present = dict(self.__present)
+        derived.__implementation_index = dict(self.__implementation_index)
+        derived.__latest_revision = dict(self.__latest_revision)
+        derived.__dependency_graph = dict(self.__dependency_graph)
+        owned = set()
+        for key in deleted:
+            key = tuple(key)
+            if key in derived.__records:
+                derived.__remove_module(key, owned)
+                del derived.__records[key]
+                del derived.__order[key]
+            derived.changed[key] = None
+        for module in modules:
+            key = module_key(module)
+            if key in derived.__records:
+                derived.__remove_module(key, owned)
+            derived.__add_module(module, owned)
+            derived.changed[key] = module
+
+        derived.modules = collections.OrderedDict(self.modules)
+        derived.modules['module'] = derived.__records.values()
+        derived.vendors = self.vendors
+        for path, value in vendors:
+            derived.vendors = replace_subtree(derived.vendors, path, value)
+        cat = collections.OrderedDict()
+        if self.catalog is not None:
+            cat.update(self.catalog['yang-catalog:catalog'])
+        cat['modules'] = derived.modules
+        if derived.vendors:
+            cat['vendors'] = derived.vendors
+        else:
+            cat.pop('vendors', None)
+        derived.catalog = collections.OrderedDict([('yang-catalog:catalog', cat)])
+        LOGGER.info('Delta {} of generation {} applied with {} modules changed, {} deleted'
+                    .format(derived.deltas, self.generation, len(modules), len(deleted)))
+        return derived
+
+    def __add_module(self, module, owned=None):
+        """Add module to the records and to all the indexes
+                Arguments:
+                    :param module: (dict) module as it is in the catalog
+                    :param owned: (set) ids of the index sets that belong to this
+                        snapshot only. If None all of them do
+        """
+        key = module_key(module)
+        if key not in self.__order:
+            self.__order[key] = self.__next_order
+            self.__next_order += 1
+        self.__records[key] = module
+        for index, term in self.__index_terms(module):
+            keys = index.get(term)
+            if keys is None:
+                keys = index[term] = set()
+                if owned is not None:
+                    owned.add(id(keys))
+            elif owned is not None and id(keys) not in owned:
+                keys = index[term] = set(keys)
+                owned.add(id(keys))
+            keys.add(key)
+        self.__dependency_graph[key] = [(dep['name'], dep.get('revision') or None)
+                                        for dep in module.get('dependencies') or []]
+        latest = self.__latest_revision.get(module['name'])
+        if latest is None or module['revision'] > latest:
+            self.__latest_revision[module['name']] = module['revision']
+
+    def __remove_module(self, key, owned):
+        """Remove module from all the indexes. Module stays in the records so
+        it keeps its position if it is added again.
+                Arguments:
+                    :param key: (tuple) key of the module
+                    :param owned: (set) ids of the index sets that belong to this
+                        snapshot only
+        """
+        module = self.__records[key]
+        for index, term in self.__index_terms(module):
+            keys = index.get(term)
+            if keys is None or key not in keys:
+                continue
+            if len(keys) == 1:
+                del index[term]
+                continue
+            if id(keys) not in owned:
+                keys = index[term] = set(keys)
+                owned.add(id(keys))
+            keys.discard(key)
+        self.__dependency_graph.pop(key, None)
+        name = module['name']
+        if self.__latest_revision.get(name) == module['revision']:
+            revisions = [self.__records[other]['revision']
+                         for other in self.__leaf_index.get(('name', name), ())]
+            if revisions:
+                self.__latest_revision[name] = max(revisions)
+            else:
+                del self.__latest_revision[name]
+
+    def __index_terms(self, module):
+        """Get all the index entries in which module needs to be stored
+                Arguments:
+                    :param module: (dict) module as it is in the catalog
+                    :return generator of tuples of index and term in the index
+        """
+        for path in MODULE_KEYS:
+            values = set()
+            leaf_values(module, path.split('/'), -1, values)
+            for value in values:
+                yield self.__leaf_index, (path, value)
+        for leaf, value in module.items():
+            if isinstance(value, basestring):
+                yield self.__top_index.setdefault(leaf, {}), value
+                if value:
+                    yield self.__present, ('string', leaf)
+        for leaf in COMPLEX_LEAFS:
+            subs = module.get(leaf)
+            if subs is None:
+                continue
+            yield self.__present, ('list', leaf)
+            if leaf not in SUBLIST_LEAFS:
+                continue
+            if len(subs) == 0:
+                yield self.__present, ('empty', leaf)
+            for sub in subs:
+                for field in SUBLIST_FIELDS:
+                    value = sub.get(field)
+                    if isinstance(value, basestring):
+                        yield self.__sub_index.setdefault((leaf, field), {}), value
+        for implementation in module_implementations(module):
+            for feature in implementation.get('feature') or []:
+                yield self.__implementation_index, ('feature', feature)
+            for deviation in implementation.get('deviation') or []:
+                yield self.__implementation_index, ('deviation', deviation.get('name'))
+
+    def __ordered(self, keys):
+        """Get modules for keys in the same order as they are in the catalog
+                Arguments:
+                    :param keys: (iterable) module keys
+                    :return list of modules
+        """
+        return [self.__records[key] for key in sorted(keys, key=self.__order.get)]
+
+    def search(self, path, value):
+        """Search for all the modules that contain value on the path
+                Arguments:
+                    :param path: (str) one of the @MODULE_KEYS
+                    :param value: (str) value searched for
+                    :return list of modules that contain the value
+        """
+        return self.__ordered(self.__leaf_index.get((path, value), ()))
+
+    def latest_revision(self, name):
+        """Get latest revision of the module in the catalog
+                Arguments:
+                    :param name: (str) name of the module
+                    :return latest revision or None if module is not in the catalog
+        """
+        return self.__latest_revision.get(name)
+
+    def latest_revisions(self, modules=None):
+        """Keep only the latest revision of every module. If there are more
+        modules with the same name and revision the first one is kept.
+                Arguments:
+                    :param modules: (list) modules to filter. If None all the
+                        modules in the catalog are filtered.
+                    :return list of modules sorted by name
+        """
+        latest = {}
+        if modules is None:
+            if self.__latest_modules is None:
+                for module in self.__records.values():
+                    name = module['name']
+                    if name not in latest and module['revision'] == self.__latest_revision[name]:
+                        latest[name] = module
+                self.__latest_modules = sorted(latest.values(), key=lambda k: k['name'])
+            return self.__latest_modules
+        for module in modules:
+            name = module['name']
+            if name not in latest or module['revision'] > latest[name]['revision']:
+                latest[name] = module
+        return sorted(latest.values(), key=lambda k: k['name'])
+
+    def get_module(self, name, revision, organization):
+        """Get module identified by name, revision and organization
+                Arguments:
+                    :param name: (str) name of the module
+                    :param revision: (str) revision of the module
+                    :param organization: (str) organization of the module
+                    :return module or None if there is no such module
+        """
+        return self.__records.get((name, revision, organization))
+
+    def get_vendors(self, path):
+        """Get part of the vendors tree on the path. Entries of the lists on
+        the path are addressed by their keys like in confd paths, for example
+        vendor/cisco/platforms/platform/ASR9K. Entries of each list are indexed
+        by their keys the first time the list is on a path.
+                Arguments:
+                    :param path: (list) path to the part split by '/'
+                    :return tuple of name of the last node on the path and its
+                        content or None if there is no such node
+        """
+        name = 'vendors'
+        node = self.vendors
+        i = 0
+        while i < len(path):
+            if not isinstance(node, dict):
+                return None
+            name = path[i]
+            node = node.get(name)
+            if isinstance(node, list) and i + 1 < len(path):
+                i += 1
+                node = self.__vendor_entries(name, node).get(path[i])
+            if node is None:
+                return None
+            i += 1
+        return name, node
+
+    def __vendor_entries(self, name, entries):
+        # list is kept next to its index so its id can not be reused by
+        # another list while the index exists
+        indexed = self.__vendor_lists.get(id(entries))
+        if indexed is None or indexed[0] is not entries:
+            keys = VENDOR_LIST_KEYS.get(name, ['name'])
+            indexed = (entries, dict((','.join(entry.get(key, '') for key in keys), entry)
+                                     for entry in entries))
+            self.__vendor_lists[id(entries)] = indexed
+        return indexed[1]
+
+    def find_module(self, name, revision):
+        """Find first module in the catalog with name and revision
+                Arguments:
+                    :param name: (str) name of the module
+                    :param revision: (str) revision of the module
+                    :return module key or None if there is no such module
+        """
+        keys = (self.__leaf_index.get(('name', name), set()) &
+                self.__leaf_index.get(('revision', revision), set()))
+        if len(keys) == 0:
+            return None
+        return min(keys, key=self.__order.get)
+
+    def find_implementations(self, name, revision=None, organization=None,
+                             features=(), deviations=()):
+        """Find platforms that implement the module. Only the modules that
+        have an implementation with all the features and deviations are
+        looked through.
+                Arguments:
+                    :param name: (str) name of the module
+                    :param revision: (str) revision of the module or None for all
+                        the revisions
+                    :param organization: (str) organization of the module or None
+                        for all the organizations
+                    :param features: (list) features the implementation needs to have
+                    :param deviations: (list) names of the deviations the
+                        implementation needs to have
+                    :return list of modules name, revision and organization with
+                        vendor, platform, software-version and software-flavor
+                        of the implementations
+        """
+        keys = self.__leaf_index.get(('name', name), set())
+        if revision is not None:
+            keys = keys & self.__leaf_index.get(('revision', revision), set())
+        if organization is not None:
+            keys = keys & self.__leaf_index.get(('organization', organization), set())
+        for feature in features:
+            keys = keys & self.__implementation_index.get(('feature', feature), set())
+        for deviation in deviations:
+            keys = keys & self.__implementation_index.get(('deviation', deviation), set())
+        found = []
+        for module in self.__ordered(keys):
+            for implementation in module_implementations(module):
+                if not set(features) <= set(implementation.get('feature') or []):
+                    continue
+                if not set(deviations) <= set(dev.get('name') for dev in implementation.get('deviation') or []):
+                    continue
+                found.append(collections.OrderedDict(
+                    [(leaf, module[leaf]) for leaf in ['name', 'revision', 'organization']] +
+                    [(leaf, implementation.get(leaf)) for leaf in IMPLEMENTATION_KEYS]))
+        return found
+
+    def dependency_closure(self, modules):
+        """Resolve all the modules that are needed to compile modules. Dependency
+        without revision is resolved to the latest revision of the module. Every
+        module name is resolved only once, the first revision found wins.
+                Arguments:
+                    :param modules: (list) modules which dependencies are resolved
+                    :return set of file names name@revision.yang of modules and
+                        all their dependencies
+        """
+        files = set()
+        seen = set()
+        for module in modules:
+            if module['name'] in seen:
+                continue
+            seen.add(module['name'])
+            files.add('{}@{}.yang'.format(module['name'], module['revision']))
+            stack = [iter([(dep['name'], dep.get('revision') or None)
+                           for dep in module.get('dependencies') or []])]
+            while stack:
+                for name, revision in stack[-1]:
+                    if name in seen:
+                        continue
+                    if revision is None:
+                        revision = self.__latest_revision.get(name)
+                        if revision is None:
+                            continue
+                    seen.add(name)
+                    files.add('{}@{}.yang'.format(name, revision))
+                    key = self.find_module(name, revision)
+                    stack.append(iter(self.__dependency_graph.get(key, [])))
+                    break
+                else:
+                    stack.pop()
+        return files
+
+    def filter_modules(self, body):
+        """Find all the modules that pass the filter sent to /search-filter.
+        Candidates are first taken from the indexes starting with the most
+        selective predicate and only those are checked against whole filter.
+                Arguments:
+                    :param body: (dict) content of the "input" container
+                    :return list of modules that passed the filter
+        """
+        partial = body.get('partial')
+        if partial is None:
+            partial = False
+        candidates = []
+        for leaf in SUBLIST_LEAFS:
+            if leaf in body:
+                for sub in body[leaf]:
+                    candidates.append(self.__sublist_candidates(leaf, sub, partial))
+        if 'implementations' in body:
+            candidates.append(self.__present.get(('list', 'implementations'), set()))
+        for leaf, value in body.items():
+            if leaf in COMPLEX_LEAFS or not isinstance(value, basestring):
+                continue
+            if partial:
+                candidates.append(self.__partial_candidates(leaf, value))
+            else:
+                candidates.append(self.__top_index.get(leaf, {}).get(value, set()))
+
+        if len(candidates) == 0:
+            keys = self.__order.keys()
+        else:
+            candidates.sort(key=len)
+            keys = set(candidates[0])
+            for candidate in candidates[1:]:
+                if not keys:
+                    break
+                keys &= candidate
+        return [module for module in self.__ordered(keys)
+                if module_passed(module, body, partial)]
+
+    def __sublist_candidates(self, leaf, sub, partial):
+        """Get keys of modules that may contain sub in the leaf list
+                Arguments:
+                    :param leaf: (str) one of the @SUBLIST_LEAFS
+                    :param sub: (dict) name, revision and schema searched for
+                    :param partial: (bool) whether values are only part of the
+                        searched values
+                    :return set of module keys
+        """
+        present = self.__present.get(('list', leaf), set())
+        found = None
+        for field in SUBLIST_FIELDS:
+            value = sub.get(field)
+            if not value:
+                continue
+            if not isinstance(value, basestring):
+                return present
+            index = self.__sub_index.get((leaf, field), {})
+            if partial:
+                keys = set()
+                for indexed, indexed_keys in index.items():
+                    if value in indexed:
+                        keys |= indexed_keys
+            else:
+                keys = index.get(value, set())
+            if found is None:
+                found = set(keys)
+            else:
+                found &= keys
+        if found is None:
+            return present
+        return found | self.__present.get(('empty', leaf), set())
+
+    def __partial_candidates(self, leaf, value):
+        """Get keys of modules that may contain part of value in the leaf.
+        Modules without the leaf pass partial search as well.
+                Arguments:
+                    :param leaf: (str) module leaf searched
+                    :param value: (str) part of the value searched for
+                    :return set of module keys
+        """
+        keys = set(self.__order.keys()) - self.__present.get(('string', leaf), set())
+        for indexed, indexed_keys in self.__top_index.get(leaf, {}).items():
+            if value in indexed:
+                keys |= indexed_keys
+        return keys
+
+
+def module_key(module):
+    """Create key that identifies module in the catalog
+            Arguments:
+                :param module: (dict) module as it is in the catalog
+                :return tuple of name, revision and organization
+    """
+    return module['name'], module['revision'], module['organization']
+
+
+def module_implementations(module):
+    """Get implementations of the module
+            Arguments:
+                :param module: (dict) module as it is in the catalog
+                :return list of implementations
+    """
+    return (module.get('implementations') or {}).get('implementation') or []
+
+
+def project(modules, fields):
+    """Keep only the requested top level leafs of the modules. Modules in
+    the snapshot are not changed.
+            Arguments:
+                :param modules: (list) modules as they are in the catalog
+                :param fields: (list) names of the leafs to keep. If None
+                    modules are returned as they are
+                :return list of modules
+    """
+    if fields is None:
+        return modules
+    fields = set(fields)
+    return [collections.OrderedDict((leaf, value) for leaf, value in module.items()
+                                    if leaf in fields)
+            for module in modules]
+
+
+def replace_subtree(data, path, value):
+    """Replace part of the tree on the path. Entries of the lists on the path
+    are addressed by their name like in confd paths, for example
+    vendor/cisco/platforms/platform/ASR9K. Tree is not changed, all the
+    containers and lists on the path are copied.
+            Arguments:
+                :param data: (dict) tree where the part is replaced
+                :param path: (list) path to the part split by '/'
+                :param value: (dict) new content of the part or None to remove it
+                :return new tree or None if the whole tree was removed
+    """
+    if len(path) == 0:
+        return value
+    data = collections.OrderedDict(data or {})
+    child = data.get(path[0])
+    # missing list is told apart from missing container by the plural name
+    # of the container, for example platforms/platform
+    if isinstance(child, list) or (child is None and len(path) > 1 and
+                                   path[1] + 's' != path[0]):
+        entries = list(child or [])
+        for i, entry in enumerate(entries):
+            if entry.get('name') == path[1]:
+                entry = replace_subtree(entry, path[2:], value)
+                if entry is None:
+                    del entries[i]
+                else:
+                    entries[i] = entry
+                break
+        else:
+            if value is not None:
+                entry = collections.OrderedDict([('name', path[1])])
+                entries.append(replace_subtree(entry, path[2:], value))
+        data[path[0]] = entries
+    else:
+        child = replace_subtree(child, path[1:], value)
+        if child is None:
+            data.pop(path[0], None)
+        else:
+            data[path[0]] = child
+    return data
+
+
+def leaf_values(data, split, count, values):
+    """Iterates recursively through the data to find all the values stored
+    on the path
+            Arguments:
+                :param data: (dict) part of the module that is searched
+                :param split: (list) path to the values split by '/'
+                :param count: (int) which part of the path are we searching.
+                :param values: (set) values found are saved in this variable
+    """
+    if isinstance(data, unicode):
+        values.add(data)
+    elif isinstance(data, list):
+        for part in data:
+            leaf_values(part, split, count, values)
+    elif isinstance(data, dict):
+        if data and count + 1 < len(split):
+            leaf_values(data.get(split[count + 1]), split, count + 1, values)
+
+
+def module_passed(module, body, partial):
+    """Check whether module passes the filter sent to /search-filter
+            Arguments:
+                :param module: (dict) module as it is in the catalog
+                :param body: (dict) content of the "input" container
+                :param partial: (bool) whether values are only part of the
+                    searched values
+                :return whether module passed the filter
+    """
+    for leaf in SUBLIST_LEAFS:
+        if leaf in body:
+            subs = module.get(leaf)
+            if subs is None or not sublist_passed(subs, body[leaf], partial):
+                return False
+    if 'implementations' in body:
+        implementations = module.get('implementations')
+        if implementations is None:
+            return False
+        if not implementations_passed(implementations.get('implementation', []),
+                                      body['implementations']['implementation'], partial):
+            return False
+    for leaf in body:
+        if partial:
+            if leaf != 'implementations' and leaf != 'submodule':
+                module_leaf = module.get(leaf)
+                if module_leaf and body[leaf] not in module_leaf:
+                    return False
+        elif leaf not in COMPLEX_LEAFS:
+            if body[leaf] != module.get(leaf):
+                return False
+    return True
+
+
+def value_passed(searched, value, partial):
+    if value is None:
+        return False
+    if partial:
+        return searched in value
+    return searched == value
+
+
+def sublist_passed(subs, searched_subs, partial):
+    """Check whether every searched sub is in the list of subs. Empty list of
+    subs passes every search.
+            Arguments:
+                :param subs: (list) dependencies, dependents or submodules of the module
+                :param searched_subs: (list) name, revision and schema searched for
+                :param partial: (bool) whether values are only part of the
+                    searched values
+                :return whether all the searched subs were found
+    """
+    for searched in searched_subs:
+        found = True
+        for sub in subs:
+            found = True
+            for field in SUBLIST_FIELDS:
+                if searched.get(field) and not value_passed(searched[field], sub.get(field), partial):
+                    found = False
+                    break
+            if found:
+                break
+        if not found:
+            return False
+    return True
+
+
+def implementations_passed(implementations, searched_implementations, partial):
+    """Check whether implementations contain searched implementations. Every
+    searched leaf narrows down the implementations that are checked by the next
+    searched leaf.
+            Arguments:
+                :param implementations: (list) implementations of the module
+                :param searched_implementations: (list) implementation leafs searched for
+                :param partial: (bool) whether values are only part of the
+                    searched values
+                :return whether implementations passed the filter
+    """
+    for searched in searched_implementations:
+        for leaf in searched:
+            found = False
+            passed_implementations = []
+            if leaf == 'deviation':
+                for implementation in implementations:
+                    deviations = implementation.get('deviation')
+                    if deviations is None:
+                        continue
+                    for searched_deviation in searched[leaf]:
+                        found = True
+                        for deviation in deviations:
+                            found = True
+                            for field in ['name', 'revision']:
+                                if (searched_deviation.get(field) and
+                                        not value_passed(searched_deviation[field], deviation.get(field), partial)):
+                                    found = False
+                                    break
+                            if found:
+                                break
+                        if not found:
+                            break
+                    if found:
+                        passed_implementations.append(implementation)
+            else:
+                for implementation in implementations:
+                    if implementation.get(leaf) is None:
+                        continue
+                    if value_passed(searched[leaf], implementation[leaf], partial):
+                        found = True
+                        passed_implementations.append(implementation)
+            if not found:
+                return False
+            implementations = passed_implementations
+    return True
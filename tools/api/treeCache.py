@@ -0,0 +1,174 @@
+import errno
+import hashlib
+import json
+import os
+import re
+import subprocess
+from threading import Lock
+
+import tools.utility.log as log
+from tools.utility.lruCache import LRUCache
+
+LOGGER = log.get_logger(__name__)
+
+IMPORT_RE = re.compile(r'(?:^|[\s;{}])(?:import|include)\s+["\']?([^\s"\';{}]+)')
+
+
+class TreeCache:
+    """Cache of pyang tree output. Output is stored under the hash of the yang
+    file content, content of all the modules it imports or includes and pyang
+    search path. Whenever any of these files is overwritten, even by another
+    process, the tree gets a new key and the old output is never served again.
+    Most recently used trees are kept in memory, the rest of them in files in
+    cache_dir.
+    """
+
+    def __init__(self, cache_dir, max_size=500, max_files=20000):
+        """
+                Arguments:
+                    :param cache_dir: (str) directory where trees are saved
+                    :param max_size: (int) maximal number of trees kept in memory
+                    :param max_files: (int) maximal number of trees saved in cache_dir
+        """
+        self.__cache_dir = cache_dir
+        self.__max_files = max_files
+        self.__memory = LRUCache(max_size)
+        self.__hashes = {}
+        self.__modules = {}
+        self.__lock = Lock()
+
+    def get_tree(self, path, search_path):
+        """Get pyang tree output of the yang file. Pyang is called only if the
+        tree of the same file content is not in the cache yet.
+                Arguments:
+                    :param path: (str) path to the yang file
+                    :param search_path: (str) pyang search path used for imports
+                    :return tuple of pyang stdout and stderr
+        """
+        key = self.__key(path, search_path)
+        if key is None:
+            return self.__pyang(path, search_path)
+        tree = self.__memory.get(key)
+        if tree is not None:
+            return tree
+        cache_file = os.path.join(self.__cache_dir, key + '.json')
+        try:
+            with open(cache_file, 'r') as f:
+                tree = tuple(part.encode('utf-8') for part in json.load(f))
+            os.utime(cache_file, None)
+        except (IOError, OSError, ValueError):
+            tree = self.__pyang(path, search_path)
+            self.__save(cache_file, tree)
+        self.__memory.set(key, tree)
+        return tree
+
+    def __key(self, path, search_path):
+        """Get key of the tree. Modules imported or included by the file and
+        by the modules it depends on are looked up in the search path. All the
+        revisions of a dependency are hashed since pyang may use any of them.
+                Arguments:
+                    :param path: (str) path to the yang file
+                    :param search_path: (str) pyang search path used for imports
+                    :return hex digest or None if file does not exist
+        """
+        info = self.__file_info(path)
+        if info is None:
+            return None
+        modules = self.__search_path_modules(search_path)
+        digests = []
+        seen = set([path])
+        dependencies = [info]
+        while len(dependencies) > 0:
+            digest, imports = dependencies.pop()
+            digests.append(digest)
+            for name in imports:
+                for dependency in modules.get(name, []):
+                    if dependency not in seen:
+                        seen.add(dependency)
+                        info = self.__file_info(dependency)
+                        if info is not None:
+                            dependencies.append(info)
+        digests = [digests[0]] + sorted(digests[1:])
+        return hashlib.sha1('{}:{}'.format(':'.join(digests), search_path)).hexdigest()
+
+    def __file_info(self, path):
+        """Get sha1 of the file content and names of the modules it imports
+        or includes. File is read again only if its modification time or size
+        changed.
+                Arguments:
+                    :param path: (str) path to the yang file
+                    :return tuple of hex digest and set of module names or None
+                        if file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self.__lock:
+            known = self.__hashes.get(path)
+        if known is not None and known[0] == stat.st_mtime and known[1] == stat.st_size:
+            return known[2]
+        with open(path, 'r') as f:
+            content = f.read()
+        info = (hashlib.sha1(content).hexdigest(), set(IMPORT_RE.findall(content)))
+        with self.__lock:
+            self.__hashes[path] = (stat.st_mtime, stat.st_size, info)
+        return info
+
+    def __search_path_modules(self, search_path):
+        """Get yang files in the search path by module name. Directory is
+        listed again only if its modification time changed.
+                Arguments:
+                    :param search_path: (str) directory with yang files
+                    :return dict of module names and lists of paths to their files
+        """
+        try:
+            mtime = os.stat(search_path).st_mtime
+        except OSError:
+            return {}
+        with self.__lock:
+            known = self.__modules.get(search_path)
+        if known is not None and known[0] == mtime:
+            return known[1]
+        modules = {}
+        for name in os.listdir(search_path):
+            if name.endswith('.yang'):
+                module = name[:-len('.yang')].split('@')[0]
+                modules.setdefault(module, []).append(os.path.join(search_path, name))
+        with self.__lock:
+            self.__modules[search_path] = (mtime, modules)
+        return modules
+
+    def __pyang(self, path, search_path):
+        arguments = ['pyang', '-p', search_path, '-f', 'tree', path]
+        pyang = subprocess.Popen(arguments,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        return pyang.communicate()
+
+    def __save(self, cache_file, tree):
+        """Save tree to the cache directory and remove least recently used
+        trees if there are more than max_files of them
+                Arguments:
+                    :param cache_file: (str) file where the tree is saved
+                    :param tree: (tuple) pyang stdout and stderr
+        """
+        try:
+            os.makedirs(self.__cache_dir)
+        except OSError as e:
+            # be happy if someone already created the path
+            if e.errno != errno.EEXIST:
+                LOGGER.error('Could not create tree cache directory {}'.format(e))
+                return
+        try:
+            temp_file = '{}.{}'.format(cache_file, os.getpid())
+            with open(temp_file, 'w') as f:
+                json.dump(tree, f)
+            os.rename(temp_file, cache_file)
+            files = [os.path.join(self.__cache_dir, name) for name in os.listdir(self.__cache_dir)]
+            if len(files) > self.__max_files:
+                files.sort(key=os.path.getmtime)
+                for old_file in files[:len(files) - self.__max_files]:
+                    os.remove(old_file)
+        except (IOError, OSError, ValueError) as e:
+            LOGGER.warning('Could not save tree to cache {}'.format(e))
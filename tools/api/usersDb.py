@@ -0,0 +1,128 @@
+import Queue
+
+import MySQLdb
+
+import tools.utility.log as log
+from tools.utility.lruCache import LRUCache
+
+LOGGER = log.get_logger(__name__)
+
+
+class UsersDb:
+    """Access to the users table of the MySQL database. Connections are kept
+    in a pool and reused by the requests. Users are looked up by their
+    username and their password hash and access rights are cached for
+    a short time so bursts of authenticated requests do not hit the database.
+    """
+
+    def __init__(self, host, db, user, passwd, pool_size=5, max_users=1000, ttl=60):
+        """
+                Arguments:
+                    :param host: (str) MySQL host
+                    :param db: (str) name of the database
+                    :param user: (str) MySQL user
+                    :param passwd: (str) password of the MySQL user
+                    :param pool_size: (int) maximal number of idle connections kept
+                    :param max_users: (int) maximal number of users cached
+                    :param ttl: (int) number of seconds users stay cached
+        """
+        self.__host = host
+        self.__db = db
+        self.__user = user
+        self.__passwd = passwd
+        self.__pool = Queue.Queue(pool_size)
+        self.__users = LRUCache(max_users, ttl)
+
+    def get_password(self, username):
+        """Get password hash of the user
+                Arguments:
+                    :param username: (str) username
+                    :return password hash or None if there is no such user
+        """
+        return self.__get_user(username)[0]
+
+    def get_access_rights_sdo(self, username):
+        """Get sdo access rights of the user
+                Arguments:
+                    :param username: (str) username
+                    :return access rights or None if there is no such user
+        """
+        return self.__get_user(username)[1]
+
+    def get_access_rights_vendor(self, username):
+        """Get vendor access rights of the user
+                Arguments:
+                    :param username: (str) username
+                    :return access rights or None if there is no such user
+        """
+        return self.__get_user(username)[2]
+
+    def invalidate(self, username=None):
+        """Drop cached user so the next lookup reads it from the database
+                Arguments:
+                    :param username: (str) username. If None all the users are dropped
+        """
+        if username is None:
+            self.__users.clear()
+        else:
+            self.__users.delete(username)
+
+    def __get_user(self, username):
+        """Get password hash and access rights of the user from the cache or
+        from the database.
+                Arguments:
+                    :param username: (str) username
+                    :return tuple of password hash, sdo access rights and vendor
+                        access rights. All of them are None if there is no such user
+        """
+        user = self.__users.get(username)
+        if user is not None:
+            return user
+        try:
+            rows = self.__execute('SELECT `Password`, `AccessRightsSdo`, `AccessRightsVendor` '
+                                  'FROM `users` WHERE `Username`=%s', (username,))
+        except MySQLdb.MySQLError as err:
+            LOGGER.error('Cannot connect to database. MySQL error: {}'.format(err))
+            return None, None, None
+        user = (None, None, None)
+        if len(rows) > 0:
+            user = tuple(rows[0])
+        self.__users.set(username, user)
+        return user
+
+    def __execute(self, query, args):
+        """Execute query on a pooled connection. If the pooled connection was
+        closed by the server the query is executed once more on a new one.
+                Arguments:
+                    :param query: (str) SQL query
+                    :param args: (tuple) arguments of the query
+                    :return all the rows selected
+        """
+        try:
+            db = self.__pool.get_nowait()
+        except Queue.Empty:
+            db = self.__connect()
+        try:
+            rows = self.__fetch(db, query, args)
+        except MySQLdb.OperationalError:
+            db.close()
+            db = self.__connect()
+            rows = self.__fetch(db, query, args)
+        try:
+            self.__pool.put_nowait(db)
+        except Queue.Full:
+            db.close()
+        return rows
+
+    @staticmethod
+    def __fetch(db, query, args):
+        cursor = db.cursor()
+        try:
+            cursor.execute(query, args)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def __connect(self):
+        return MySQLdb.connect(host=self.__host, db=self.__db, user=self.__user,
+                               passwd=self.__passwd)
@@ -1,13 +1,37 @@
+import argparse
+import os
 import sqlite3
 import json
 import re
+import threading
 
 DBF = '/var/yang/yang.db'
+# Full-text index of the searched fields of the yindex table
+FTS_TABLE = 'yindex_fts'
+# Trigram tokenizer can not match shorter terms
+FTS_MIN_LENGTH = 3
+# Latest revision of every module of the modules table
+LATEST_TABLE = 'latest_revisions'
+# Maximal number of compiled regular expressions kept
+MAX_PATTERNS = 100
+
+__patterns = {}
+__local = threading.local()
+__pragmas = [
+    'PRAGMA query_only=ON',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY'
+]
 
 
 def __sqlite_regexp(pattern, buf, modifiers=re.I | re.S):
     if pattern is not None and buf is not None:
-        exp = re.compile(pattern, modifiers)
+        exp = __patterns.get((pattern, modifiers))
+        if exp is None:
+            if len(__patterns) >= MAX_PATTERNS:
+                __patterns.clear()
+            exp = __patterns[(pattern, modifiers)] = re.compile(pattern, modifiers)
         return exp.search(buf) is not None
 
     return False
@@ -41,12 +65,120 @@ __node_data = {
 }
 
 
-def do_search(options):
-    opts = json.loads(options)
-    try:
+def __connect():
+    """Get read-only connection of this thread. Connection is kept open
+    between the searches and opened again when the database file is replaced.
+    Tables of the database are looked up again when its schema changes.
+            :return tuple of connection and names of the tables
+    """
+    st = os.stat(DBF)
+    ident = (DBF, st.st_dev, st.st_ino)
+    conn = getattr(__local, 'conn', None)
+    if conn is not None and __local.ident != ident:
+        conn.close()
+        conn = None
+    if conn is None:
         conn = sqlite3.connect(DBF)
         conn.row_factory = sqlite3.Row
         conn.create_function('REGEXP', 2, __sqlite_regexp)
+        for pragma in __pragmas:
+            conn.execute(pragma)
+        __local.conn = conn
+        __local.ident = ident
+        __local.schema = None
+    schema = conn.execute('PRAGMA schema_version').fetchone()[0]
+    if __local.schema != schema:
+        __local.tables = set(row[0] for row in
+                             conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        __local.schema = schema
+    return conn, __local.tables
+
+
+def __fts_match(fields, term):
+    # phrase in double quotes is matched as a substring by the trigram tokenizer
+    return '{{{}}} : "{}"'.format(' '.join(fields), term.replace('"', '""'))
+
+
+def build_fts(dbf=DBF):
+    """Create full-text index of the argument, description and module of the
+    yindex table and index all of its rows. Triggers keep the index in sync
+    with the changes of the table. Index needs to be built again when the
+    yindex table is created again or when the database is vacuumed since
+    the rows of the table may get new rowids.
+            Arguments:
+                :param dbf: (str) path to the sqlite database
+    """
+    conn = sqlite3.connect(dbf)
+    try:
+        with conn:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS {0} USING fts5("
+                         "argument, description, module, content='yindex', "
+                         "tokenize='trigram')".format(FTS_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_insert AFTER INSERT ON yindex BEGIN "
+                         "INSERT INTO {0}(rowid, argument, description, module) "
+                         "VALUES (new.rowid, new.argument, new.description, new.module); "
+                         "END".format(FTS_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_delete AFTER DELETE ON yindex BEGIN "
+                         "INSERT INTO {0}({0}, rowid, argument, description, module) "
+                         "VALUES ('delete', old.rowid, old.argument, old.description, old.module); "
+                         "END".format(FTS_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_update AFTER UPDATE ON yindex BEGIN "
+                         "INSERT INTO {0}({0}, rowid, argument, description, module) "
+                         "VALUES ('delete', old.rowid, old.argument, old.description, old.module); "
+                         "INSERT INTO {0}(rowid, argument, description, module) "
+                         "VALUES (new.rowid, new.argument, new.description, new.module); "
+                         "END".format(FTS_TABLE))
+            conn.execute("INSERT INTO {0}({0}) VALUES ('rebuild')".format(FTS_TABLE))
+    finally:
+        conn.close()
+
+
+def build_latest_revisions(dbf=DBF):
+    """Create table with the latest revision of every module of the modules
+    table so searches do not need to compute them. Triggers keep the table in
+    sync with the changes of the modules table. Indexes cover the lookups
+    of the revisions by the module name.
+            Arguments:
+                :param dbf: (str) path to the sqlite database
+    """
+    conn = sqlite3.connect(dbf)
+    try:
+        with conn:
+            conn.execute('CREATE INDEX IF NOT EXISTS modules_module_revision ON modules(module, revision)')
+            conn.execute('CREATE TABLE IF NOT EXISTS {} (module TEXT PRIMARY KEY, revision TEXT) '
+                         'WITHOUT ROWID'.format(LATEST_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_insert AFTER INSERT ON modules BEGIN "
+                         "INSERT OR REPLACE INTO {0} SELECT module, MAX(revision) FROM modules "
+                         "WHERE module = new.module; "
+                         "END".format(LATEST_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_delete AFTER DELETE ON modules BEGIN "
+                         "DELETE FROM {0} WHERE module = old.module; "
+                         "INSERT INTO {0} SELECT module, MAX(revision) FROM modules "
+                         "WHERE module = old.module GROUP BY module; "
+                         "END".format(LATEST_TABLE))
+            conn.execute("CREATE TRIGGER IF NOT EXISTS {0}_update AFTER UPDATE ON modules BEGIN "
+                         "DELETE FROM {0} WHERE module IN (old.module, new.module); "
+                         "INSERT INTO {0} SELECT module, MAX(revision) FROM modules "
+                         "WHERE module IN (old.module, new.module) GROUP BY module; "
+                         "END".format(LATEST_TABLE))
+            conn.execute('DELETE FROM {}'.format(LATEST_TABLE))
+            conn.execute('INSERT INTO {} SELECT module, MAX(revision) FROM modules '
+                         'GROUP BY module'.format(LATEST_TABLE))
+    finally:
+        conn.close()
+
+
+def do_search(options):
+    """Search the keyword index. Only the page set with limit and offset
+    options is selected if limit is set.
+            Arguments:
+                :param options: (str) json with the search options and filters
+                :return generator of the results read from the database as
+                    they are consumed
+    """
+    opts = json.loads(options)
+    try:
+        conn, tables = __connect()
         if 'case-sensitive' in opts and opts['case-sensitive']:
             conn.execute('PRAGMA case_sensitive_like=ON')
         else:
@@ -54,17 +186,40 @@ def do_search(options):
 
         cur = conn.cursor()
 
-        sql = 'SELECT yi.*, MAX(mo.revision) AS latest_revision FROM yindex yi, modules mo WHERE '
-        qparams = {'descr': '%' + opts['search'] + '%'}
+        qparams = {'descr': '%' + opts['search'] + '%', 'pattern': opts['search']}
         sts = __search_fields
         if 'search-fields' in opts:
             sts = opts['search-fields']
 
+        regex = 'type' in opts and opts['type'] == 'regex'
+        fields = [field for field in sts if field in __search_fields]
+        # full-text index only narrows down the rows, they are still
+        # checked with LIKE so case sensitivity is kept. Index matches LIKE
+        # wildcards literally so terms with wildcards are not searched in it
+        use_fts = (not regex and len(fields) > 0 and len(opts['search']) >= FTS_MIN_LENGTH and
+                   '%' not in opts['search'] and '_' not in opts['search'] and
+                   FTS_TABLE in tables)
+        use_latest = LATEST_TABLE in tables
+        if use_latest:
+            sql = 'SELECT yi.*, lr.revision AS latest_revision'
+        else:
+            sql = 'SELECT yi.*, MAX(mo.revision) AS latest_revision'
+        if use_fts:
+            sql += (', MIN(fts.rank) AS score FROM (SELECT rowid, rank FROM {0} WHERE {0} MATCH :match) fts '
+                    'JOIN yindex yi ON yi.rowid = fts.rowid'.format(FTS_TABLE))
+            qparams['match'] = __fts_match(fields, opts['search'])
+        else:
+            sql += ' FROM yindex yi'
+        if use_latest:
+            sql += ' JOIN {} lr ON lr.module = yi.module WHERE '.format(LATEST_TABLE)
+        else:
+            sql += ', modules mo WHERE (mo.module = yi.module) AND '
+
         wclause = []
-        if 'type' in opts and opts['type'] == 'regex':
+        if regex:
             for field in sts:
                 if field in __search_fields:
-                    wclause.append('REGEXP(:descr, yi.{})'.format(field))
+                    wclause.append('REGEXP(:pattern, yi.{})'.format(field))
         else:
             for field in sts:
                 if field in __search_fields:
@@ -80,14 +235,36 @@ def do_search(options):
             sql += ' OR '.join(queries)
             sql += ')'
 
-        sql += ' AND (mo.module = yi.module) GROUP BY yi.argument, yi.module, yi.revision'
+        latest_revisions = 'latest-revisions' in opts and opts['latest-revisions'] is True
+        if latest_revisions and use_latest:
+            sql += ' AND (yi.revision = lr.revision)'
+        sql += ' GROUP BY yi.argument, yi.module, yi.revision'
+        if latest_revisions and not use_latest:
+            sql += ' HAVING yi.revision = MAX(mo.revision)'
+        # stable order so the pages do not overlap
+        if use_fts:
+            sql += ' ORDER BY score, yi.argument, yi.module, yi.revision'
+        else:
+            sql += ' ORDER BY yi.argument, yi.module, yi.revision'
+        if 'limit' in opts:
+            sql += ' LIMIT :limit OFFSET :offset'
+            qparams['limit'] = int(opts['limit'])
+            qparams['offset'] = int(opts.get('offset', 0))
         cur.execute(sql, qparams)
 
-        results = []
         filter_list = __node_data.keys()
         if 'filter' in opts and 'node' in opts['filter']:
             filter_list = opts['filter']['node']
 
+        return __results(cur, filter_list, opts['search'])
+    except sqlite3.Error as e:
+        raise Exception("Error searching for {}: {}".format(
+            opts['search'], e.args[0]))
+
+
+def __results(cur, filter_list, search):
+    # rows are read from the database while the results are consumed
+    try:
         for row in cur:
             module = {'latest_revision': row['latest_revision'], 'name': row[
                 'module'], 'revision': row['revision'], 'organization': row['organization']}
@@ -97,9 +274,18 @@ def do_search(options):
                 if nf in __node_data:
                     result['node'][nf] = row[__node_data[nf]]
 
-            results.append(result)
-
-        return results
+            yield result
     except sqlite3.Error as e:
-        raise Exception("Error searching for {}: {}".format(
-            opts['search'], e.args[0]))
+        raise Exception("Error searching for {}: {}".format(search, e.args[0]))
+    finally:
+        cur.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build full-text index and latest revisions '
+                                                 'of the YANG keyword search database')
+    parser.add_argument('--db-path', type=str, default=DBF,
+                        help='Set path to the sqlite database. Default -> {}'.format(DBF))
+    args = parser.parse_args()
+    build_fts(args.db_path)
+    build_latest_revisions(args.db_path)
@@ -24,6 +24,13 @@
 
 import urllib
 
+from tools.utility.lruCache import LRUCache
+
+# Maximal number of modules kept by module_factory
+MAX_SEEN_MODULES = 2000
+# Number of seconds modules are kept by module_factory
+SEEN_MODULES_TTL = 3600
+
 
 class Module(object):
     __object_dict = {
@@ -59,7 +66,8 @@ class Module(object):
         'implementations': True
     }
 
-    __seen_modules = {}
+    __seen_modules = LRUCache(MAX_SEEN_MODULES, SEEN_MODULES_TTL)
+    __generation = None
 
     def __init__(self, rest, name, revision, organization, attrs={}):
         self.__rester = rest
@@ -87,26 +95,37 @@ class Module(object):
     def module_factory(rest, name, revision, organization, override=False, attrs={}):
         mod_sig = '{}@{}/{}'.format(name, revision, organization)
 
-        create_new = False
-        if mod_sig not in Module.__seen_modules:
-            create_new = True
-        elif override:
-            Module.__seen_modules[mod_sig] = None
-            create_new = True
+        module = None
+        if not override:
+            module = Module.__seen_modules.get(mod_sig)
 
-        if create_new:
-            Module.__seen_modules[mod_sig] = Module(
-                rest, name, revision, organization, attrs)
+        if module is None:
+            module = Module(rest, name, revision, organization, attrs)
+            Module.__seen_modules.set(mod_sig, module)
 
-        return Module.__seen_modules[mod_sig]
+        return module
 
-    def __fetch(self):
-        if self.__initialized:
-            return
+    @staticmethod
+    def set_generation(generation):
+        # modules seen in the previous generation of the catalog may be stale
+        if generation == Module.__generation:
+            return None
+        stats = Module.get_cache_stats()
+        Module.__seen_modules.clear()
+        Module.__generation = generation
+        return stats
+
+    @staticmethod
+    def get_cache_stats():
+        return {'size': len(Module.__seen_modules), 'hits': Module.__seen_modules.hits,
+                'misses': Module.__seen_modules.misses}
 
-        result = self.__rester.get('/search/modules/{},{},{}'.format(urllib.quote(
-            self.__dict['name']), urllib.quote(self.__dict['revision']), urllib.quote(self.__dict['organization'])))
-        for key, value in result['module'][0].items():
+    def __path(self):
+        return '/search/modules/{},{},{}'.format(urllib.quote(
+            self.__dict['name']), urllib.quote(self.__dict['revision']), urllib.quote(self.__dict['organization']))
+
+    def __set(self, attrs):
+        for key, value in attrs.items():
             if key in Module.__object_dict:
                 self.__dict[key] = value
             else:
@@ -115,6 +134,13 @@ class Module(object):
 
         self.__initialized = True
 
+    def __fetch(self):
+        if self.__initialized:
+            return
+
+        result = self.__rester.get(self.__path())
+        self.__set(result['module'][0])
+
     def get(self, field):
         if field not in Module.__object_dict:
             raise Exception("Field {} does not exist; please specify one of:\n\n{}".format(
@@ -149,8 +175,3 @@ class Module(object):
             arr[key] = self.__dict[key]
 
         return arr
-
-    def __del__(self):
-        mod_sig = self.get_mod_sig()
-        if mod_sig in Module.__seen_modules:
-            del Module.__seen_modules[mod_sig]
@@ -22,7 +22,7 @@
 # OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF
 # SUCH DAMAGE.
 
-import requests
+from tools.utility import httpClient
 
 REST_TIMEOUT = 300
 
@@ -52,21 +52,23 @@ class Rester(object):
             raise RestException("Failed to {}: {}".format(
                 msg, resp.text), resp.status_code)
 
+    def __auth(self):
+        if self.__username is not None and self.__password is not None:
+            return (self.__username, self.__password)
+        return ()
+
     def get(self, path, want_json=True):
         url = self.__base
 
         url += path
 
-        auth = ()
-        if self.__username is not None and self.__password is not None:
-            auth = (self.__username, self.__password)
-
         headers = {}
         if want_json:
             headers['Accept'] = 'application/json'
 
-        resp = requests.get(url, auth=auth, headers=headers,
-                            timeout=self.__timeout)
+        # connections to the base are kept alive and shared by all the resters
+        resp = httpClient.get(url, auth=self.__auth(), headers=headers,
+                              timeout=self.__timeout)
         Rester.__assert_response(
             resp, "get {} from {}".format(path, self.__base))
 
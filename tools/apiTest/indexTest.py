@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import tools.api.yangSearch.index as index
+
+YINDEX = [
+    ('ietf-interfaces', '2014-05-08', 'ietf', '/if:interfaces', 'container', 'interfaces', 'Interface parameters.'),
+    ('ietf-interfaces', '2014-05-08', 'ietf', '/if:interfaces/if:name', 'leaf', 'name', 'The name of the Interface.'),
+    ('ietf-interfaces', '2017-08-17', 'ietf', '/if:interfaces', 'container', 'interfaces', 'Interface parameters.'),
+    ('ietf-ip', '2014-06-16', 'ietf', '/ip:mtu', 'leaf', 'mtu', 'The size of the largest IPv4 packet.'),
+    ('ietf-ip', '2014-06-16', 'ietf', '/ip:ietf_interfaces', 'leaf', 'ietf_interfaces', 'Literal underscore.')
+]
+MODULES = [
+    ('ietf-interfaces', '2014-05-08', 'ietf'),
+    ('ietf-interfaces', '2017-08-17', 'ietf'),
+    ('ietf-ip', '2014-06-16', 'ietf')
+]
+SEARCHES = [
+    {'search': 'interface'},
+    {'search': 'Interface', 'case-sensitive': True},
+    {'search': 'ietf_interfaces', 'search-fields': ['module', 'argument']},
+    {'search': 'ip'},
+    {'search': 'interface', 'latest-revisions': True},
+    {'search': 'interface', 'schema-types': ['leaf']},
+    {'search': 'name|mtu', 'type': 'regex'}
+]
+
+
+class IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dbf = os.path.join(self.directory, 'yang.db')
+        conn = sqlite3.connect(self.dbf)
+        with conn:
+            conn.execute('CREATE TABLE yindex (module, revision, organization, path, statement, '
+                         'argument, description, properties)')
+            conn.execute('CREATE TABLE modules (module, revision, organization)')
+            conn.executemany('INSERT INTO yindex VALUES (?, ?, ?, ?, ?, ?, ?, NULL)', YINDEX)
+            conn.executemany('INSERT INTO modules VALUES (?, ?, ?)', MODULES)
+        conn.close()
+        self.original_dbf = index.DBF
+        index.DBF = self.dbf
+
+    def tearDown(self):
+        index.DBF = self.original_dbf
+        shutil.rmtree(self.directory)
+
+    def search(self, options):
+        return sorted((row['module']['name'], row['module']['revision'], row['node']['path'],
+                       row['module']['latest_revision'])
+                      for row in index.do_search(json.dumps(options)))
+
+    def build(self):
+        index.build_fts(self.dbf)
+        index.build_latest_revisions(self.dbf)
+
+    def testIndexedSearchMatchesScan(self):
+        scanned = [self.search(options) for options in SEARCHES]
+        self.build()
+        indexed = [self.search(options) for options in SEARCHES]
+        self.assertEqual(indexed, scanned)
+        # underscore is a LIKE wildcard, it matches the dash as well
+        self.assertEqual(len(indexed[2]), 4)
+        self.assertEqual(set(row[1] for row in indexed[4]), set(['2017-08-17', '2014-06-16']))
+
+    def testIndexesFollowChanges(self):
+        self.build()
+        conn = sqlite3.connect(self.dbf)
+        with conn:
+            conn.execute("INSERT INTO modules VALUES ('ietf-interfaces', '2018-02-20', 'ietf')")
+            conn.execute("INSERT INTO yindex VALUES ('ietf-interfaces', '2018-02-20', 'ietf', '/if:speed', "
+                         "'leaf', 'speed', 'Interface speed.', NULL)")
+            conn.execute("DELETE FROM yindex WHERE path = '/ip:mtu'")
+        conn.close()
+        found = self.search({'search': 'speed'})
+        self.assertEqual(found, [('ietf-interfaces', '2018-02-20', '/if:speed', '2018-02-20')])
+        self.assertEqual(self.search({'search': 'largest'}), [])
+        self.assertEqual(set(row[3] for row in self.search({'search': 'interface'})
+                             if row[0] == 'ietf-interfaces'), set(['2018-02-20']))
+
+    def testPages(self):
+        self.build()
+        for options in [{'search': 'interface'}, {'search': 'i'}]:
+            rows = [row['node']['path'] for row in index.do_search(json.dumps(options))]
+            pages = []
+            for offset in range(0, len(rows), 2):
+                page = dict(options, limit=2, offset=offset)
+                pages.extend(row['node']['path'] for row in index.do_search(json.dumps(page)))
+            self.assertEqual(pages, rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
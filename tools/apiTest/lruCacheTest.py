@@ -0,0 +1,76 @@
+import unittest
+
+import tools.utility.lruCache as lruCache
+from tools.utility.lruCache import LRUCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.original_time = lruCache.time
+        lruCache.time = self.clock
+
+    def tearDown(self):
+        lruCache.time = self.original_time
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        # b is the least recently used one since a was read
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+        cache.set('a', 4)
+        cache.set('d', 5)
+        self.assertEqual(cache.get('a'), 4)
+        self.assertIsNone(cache.get('c'))
+
+    def testTtl(self):
+        cache = LRUCache(10, 60)
+        cache.set('a', 1)
+        self.clock.now += 30
+        cache.set('b', 2)
+        self.clock.now += 30
+        self.assertEqual(cache.get('a'), 1)
+        self.clock.now += 1
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+        # reading does not extend the ttl, setting again does
+        cache.set('a', 3)
+        self.clock.now += 30
+        self.assertEqual(cache.get('a'), 3)
+        self.assertIsNone(cache.get('b'))
+
+    def testCounters(self):
+        cache = LRUCache(10)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('a')
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.delete('a')
+        cache.delete('missing')
+        cache.get('a')
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        cache.set('b', 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get('b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tools.api.recordStore import RecordStore
+
+RECORDS = [
+    ('ietf-interfaces@2014-05-08/ietf', json.dumps({'name': 'ietf-interfaces', 'revision': '2014-05-08'})),
+    ('ietf-ip@2014-06-16/ietf', json.dumps({'name': 'ietf-ip', 'revision': '2014-06-16'})),
+    ('empty@1970-01-01/ietf', '')
+]
+
+
+class RecordStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRoundTrip(self):
+        for compress in [False, True]:
+            generation = 'gen-{}'.format(compress)
+            RecordStore.write(self.directory, generation, RECORDS, compress)
+            records = RecordStore(self.directory, generation)
+            self.assertEqual(records.generation, generation)
+            self.assertEqual(records.deltas, 0)
+            for key, record in RECORDS:
+                self.assertEqual(records.get(key), record)
+            self.assertIsNone(records.get('missing@1970-01-01/ietf'))
+
+    def testNoRecords(self):
+        RecordStore.write(self.directory, '1', [])
+        self.assertIsNone(RecordStore(self.directory, '1').get(RECORDS[0][0]))
+
+    def testDerive(self):
+        RecordStore.write(self.directory, '1', RECORDS)
+        records = RecordStore(self.directory, '1')
+        changed = json.dumps({'name': 'ietf-ip', 'revision': '2014-06-16', 'prefix': 'ip'})
+        derived = records.derive(2, {RECORDS[0][0]: None, RECORDS[1][0]: changed})
+        self.assertEqual(derived.deltas, 2)
+        self.assertIsNone(derived.get(RECORDS[0][0]))
+        self.assertEqual(derived.get(RECORDS[1][0]), changed)
+        self.assertEqual(derived.get(RECORDS[2][0]), RECORDS[2][1])
+        # records the delta was derived from are not changed
+        self.assertEqual(records.deltas, 0)
+        self.assertEqual(records.get(RECORDS[1][0]), RECORDS[1][1])
+
+    def testRemove(self):
+        RecordStore.write(self.directory, '1', RECORDS)
+        RecordStore.write(self.directory, '2', RECORDS)
+        RecordStore.remove(self.directory, '1')
+        RecordStore.remove(self.directory, '3')
+        self.assertRaises(IOError, RecordStore, self.directory, '1')
+        self.assertEqual(RecordStore(self.directory, '2').get(RECORDS[1][0]), RECORDS[1][1])
+        self.assertEqual(sorted(os.listdir(self.directory)), ['2.index', '2.records'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import json
+import unittest
+
+from tools.api.snapshot import Snapshot, project, replace_subtree
+
+MODULES = [
+    {'name': 'ietf-interfaces', 'revision': '2014-05-08', 'organization': 'ietf',
+     'namespace': 'urn:ietf:params:xml:ns:yang:ietf-interfaces', 'ietf': {'ietf-wg': 'netmod'},
+     'dependencies': [], 'dependents': [{'name': 'ietf-ip', 'revision': '2014-06-16'}],
+     'implementations': {'implementation': [
+         {'vendor': 'cisco', 'platform': 'ASR9K', 'feature': ['if-mib'],
+          'deviation': [{'name': 'cisco-xr-ietf-interfaces-deviations', 'revision': '2016-05-16'}]},
+         {'vendor': 'huawei', 'platform': 'NE40E'}]}},
+    {'name': 'ietf-ip', 'revision': '2014-06-16', 'organization': 'ietf',
+     'namespace': 'urn:ietf:params:xml:ns:yang:ietf-ip', 'ietf': {'ietf-wg': 'netmod'},
+     'dependencies': [{'name': 'ietf-interfaces'}, {'name': 'ietf-inet-types', 'revision': '2013-07-15'}]},
+    {'name': 'ietf-interfaces', 'revision': '2017-08-17', 'organization': 'ietf',
+     'namespace': 'urn:ietf:params:xml:ns:yang:ietf-interfaces',
+     'dependencies': [{'name': 'ietf-yang-types'}]},
+    {'name': 'Cisco-IOS-XR-ifmgr-cfg', 'revision': '2015-07-30', 'organization': 'cisco',
+     'namespace': 'http://cisco.com/ns/yang/Cisco-IOS-XR-ifmgr-cfg',
+     'dependencies': [{'name': 'ietf-interfaces', 'revision': '2014-05-08'}]}
+]
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        catalog = {'yang-catalog:catalog': {'modules': {'module': MODULES}}}
+        self.snapshot = Snapshot('1', json.dumps(catalog))
+
+    def names(self, modules):
+        return [(module['name'], module['revision']) for module in modules]
+
+    def testSearch(self):
+        self.assertEqual(self.names(self.snapshot.search('name', u'ietf-interfaces')),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-interfaces', '2017-08-17')])
+        self.assertEqual(self.names(self.snapshot.search('ietf/ietf-wg', u'netmod')),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-ip', '2014-06-16')])
+        self.assertEqual(self.snapshot.search('organization', u'openconfig'), [])
+
+    def testFilterExact(self):
+        body = {'organization': 'ietf', 'dependencies': [{'name': 'ietf-interfaces'}]}
+        self.assertEqual(self.names(self.snapshot.filter_modules(body)),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-ip', '2014-06-16')])
+        body = {'dependencies': [{'name': 'ietf-interfaces', 'revision': '2014-05-08'}]}
+        self.assertEqual(self.names(self.snapshot.filter_modules(body)),
+                         [('ietf-interfaces', '2014-05-08'), ('Cisco-IOS-XR-ifmgr-cfg', '2015-07-30')])
+
+    def testFilterPartial(self):
+        body = {'partial': True, 'namespace': 'ietf-interfaces'}
+        self.assertEqual(self.names(self.snapshot.filter_modules(body)),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-interfaces', '2017-08-17')])
+        body = {'partial': True, 'submodule': [{'name': 'ietf'}]}
+        self.assertEqual(self.snapshot.filter_modules(body), [])
+
+    def testFilterImplementations(self):
+        body = {'implementations': {'implementation': [
+            {'vendor': 'cisco', 'deviation': [{'name': 'cisco-xr-ietf-interfaces-deviations'}]}]}}
+        self.assertEqual(self.names(self.snapshot.filter_modules(body)),
+                         [('ietf-interfaces', '2014-05-08')])
+        body = {'implementations': {'implementation': [{'vendor': 'huawei', 'feature': ['if-mib']}]}}
+        self.assertEqual(self.snapshot.filter_modules(body), [])
+
+    def testLatestRevisions(self):
+        self.assertEqual(self.snapshot.latest_revision('ietf-interfaces'), '2017-08-17')
+        self.assertEqual(self.names(self.snapshot.latest_revisions()),
+                         [('Cisco-IOS-XR-ifmgr-cfg', '2015-07-30'), ('ietf-interfaces', '2017-08-17'),
+                          ('ietf-ip', '2014-06-16')])
+        modules = self.snapshot.search('ietf/ietf-wg', u'netmod')
+        self.assertEqual(self.names(self.snapshot.latest_revisions(modules)),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-ip', '2014-06-16')])
+
+    def testDependencyClosure(self):
+        modules = self.snapshot.search('name', u'Cisco-IOS-XR-ifmgr-cfg')
+        self.assertEqual(self.snapshot.dependency_closure(modules),
+                         {'Cisco-IOS-XR-ifmgr-cfg@2015-07-30.yang', 'ietf-interfaces@2014-05-08.yang'})
+        modules = self.snapshot.search('name', u'ietf-ip')
+        self.assertEqual(self.snapshot.dependency_closure(modules),
+                         {'ietf-ip@2014-06-16.yang', 'ietf-interfaces@2017-08-17.yang',
+                          'ietf-inet-types@2013-07-15.yang'})
+
+    def testProject(self):
+        modules = self.snapshot.search('name', u'ietf-ip')
+        self.assertEqual(project(modules, ['name', 'revision', 'missing']),
+                         [{'name': 'ietf-ip', 'revision': '2014-06-16'}])
+        self.assertIn('namespace', modules[0])
+        self.assertIs(project(modules, None), modules)
+
+    def testApply(self):
+        changed = json.loads(json.dumps(MODULES[2]))
+        changed['namespace'] = u'urn:changed'
+        added = json.loads('{"name": "ietf-interfaces", "revision": "2018-02-20", "organization": "ietf"}')
+        vendors = [(['vendor', 'cisco', 'platforms', 'platform', 'ASR9K'], {'name': 'ASR9K'})]
+        derived = self.snapshot.apply([changed, added], [['ietf-ip', '2014-06-16', 'ietf']], vendors)
+        self.assertEqual(self.names(derived.modules['module']),
+                         [('ietf-interfaces', '2014-05-08'), ('ietf-interfaces', '2017-08-17'),
+                          ('Cisco-IOS-XR-ifmgr-cfg', '2015-07-30'), ('ietf-interfaces', '2018-02-20')])
+        self.assertEqual(self.names(derived.search('namespace', u'urn:changed')),
+                         [('ietf-interfaces', '2017-08-17')])
+        self.assertEqual(derived.search('name', u'ietf-ip'), [])
+        self.assertEqual(derived.latest_revision('ietf-interfaces'), '2018-02-20')
+        self.assertIsNone(derived.latest_revision('ietf-ip'))
+        self.assertEqual(derived.vendors['vendor'][0]['platforms']['platform'], [{'name': 'ASR9K'}])
+        self.assertEqual(derived.changed[('ietf-ip', '2014-06-16', 'ietf')], None)
+        # original snapshot is not changed
+        self.assertEqual(self.names(self.snapshot.search('name', u'ietf-ip')), [('ietf-ip', '2014-06-16')])
+        self.assertEqual(self.snapshot.search('namespace', u'urn:changed'), [])
+        self.assertEqual(self.snapshot.latest_revision('ietf-interfaces'), '2017-08-17')
+        self.assertEqual(self.snapshot.vendors, {})
+
+    def testReplaceSubtree(self):
+        tree = {'vendor': [{'name': 'cisco', 'platforms': {'platform': [{'name': 'ASR9K'}, {'name': 'NCS5500'}]}}]}
+        replaced = replace_subtree(tree, ['vendor', 'cisco', 'platforms', 'platform', 'ASR9K'], None)
+        self.assertEqual(replaced['vendor'][0]['platforms']['platform'], [{'name': 'NCS5500'}])
+        self.assertEqual(len(tree['vendor'][0]['platforms']['platform']), 2)
+
+    def testGetVendors(self):
+        vendors = [(['vendor', 'cisco', 'platforms', 'platform', 'ASR9K', 'software-versions', 'software-version',
+                     '6.1.1', 'software-flavors', 'software-flavor', 'ALL', 'modules', 'module',
+                     'ietf-interfaces,2014-05-08,ietf'], {'name': 'ietf-interfaces', 'revision': '2014-05-08',
+                                                          'organization': 'ietf', 'conformance-type': 'implement'})]
+        derived = self.snapshot.apply([], [], vendors)
+        name, module = derived.get_vendors(['vendor', 'cisco', 'platforms', 'platform', 'ASR9K', 'software-versions',
+                                            'software-version', '6.1.1', 'software-flavors', 'software-flavor',
+                                            'ALL', 'modules', 'module', 'ietf-interfaces,2014-05-08,ietf'])
+        self.assertEqual((name, module['conformance-type']), ('module', 'implement'))
+        name, platforms = derived.get_vendors(['vendor', 'cisco', 'platforms'])
+        self.assertEqual((name, platforms['platform'][0]['name']), ('platforms', 'ASR9K'))
+        name, vendor = derived.get_vendors(['vendor'])
+        self.assertEqual((name, len(vendor)), ('vendor', 1))
+        self.assertIsNone(derived.get_vendors(['vendor', 'huawei']))
+        self.assertIsNone(derived.get_vendors(['vendor', 'cisco', 'name', 'cisco']))
+        self.assertIsNone(self.snapshot.get_vendors(['vendor', 'cisco']))
+
+    def testApplyVendorDeletion(self):
+        path = ['vendor', 'cisco', 'platforms', 'platform', 'ASR9K', 'software-versions', 'software-version',
+                '6.1.1']
+        version = {'name': '6.1.1', 'software-flavors': {'software-flavor': [{'name': 'ALL'}]}}
+        added = self.snapshot.apply([], [], [(path, version)])
+        # receiver sends path of the deleted subtree, confd responds with 404
+        # to its download so the subtree is replaced with None
+        url = 'http://localhost:8008/api/config/catalog/vendors/' + '/'.join(path) + '?deep'
+        deleted_path = url.split('?')[0].split('/catalog/vendors/')[-1]
+        deleted = added.apply([], [], [(deleted_path.split('/'), None)])
+        self.assertIsNone(deleted.get_vendors(path))
+        name, versions = deleted.get_vendors(path[:-2])
+        self.assertEqual((name, versions), ('software-versions', {'software-version': []}))
+        self.assertEqual(added.get_vendors(path), ('software-version', version))
+
+    def testFindImplementations(self):
+        found = self.snapshot.find_implementations('ietf-interfaces')
+        self.assertEqual([(impl['revision'], impl['vendor'], impl['platform']) for impl in found],
+                         [('2014-05-08', 'cisco', 'ASR9K'), ('2014-05-08', 'huawei', 'NE40E')])
+        found = self.snapshot.find_implementations('ietf-interfaces', features=['if-mib'],
+                                                   deviations=['cisco-xr-ietf-interfaces-deviations'])
+        self.assertEqual([impl['platform'] for impl in found], ['ASR9K'])
+        self.assertEqual(self.snapshot.find_implementations('ietf-interfaces', '2017-08-17'), [])
+        self.assertEqual(self.snapshot.find_implementations('ietf-interfaces', features=['missing']), [])
+        derived = self.snapshot.apply([], [['ietf-interfaces', '2014-05-08', 'ietf']], [])
+        self.assertEqual(derived.find_implementations('ietf-interfaces', features=['if-mib']), [])
+        self.assertEqual(len(self.snapshot.find_implementations('ietf-interfaces', features=['if-mib'])), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,13 +6,13 @@ import json
 import os
 import shutil
 import subprocess
+import time
 import unicodedata
 from datetime import datetime
 
-import requests
-
 import tools.utility.log as log
 from tools.api.receiver import send_to_indexing
+from tools.utility import httpClient
 from tools.utility.util import get_curr_dir
 
 LOGGER = log.get_logger('populate')
@@ -30,6 +30,45 @@ def find_files(directory, pattern):
 def unicode_normalize(variable):
     return unicodedata.normalize('NFKD', variable).encode('ascii', 'ignore')
 
+
+def reload_cache(yangcatalog_api_prefix, credentials, timeout=3600):
+    """Reload cache of the api and wait until the reload is done so the
+    following requests read the new catalog. If another reload is already
+    running it may have started before the catalog was changed, so a new
+    reload is requested once it is done.
+            Arguments:
+                :param yangcatalog_api_prefix: (str) prefix for sending request to api
+                :param credentials: (list) Basic authorization credentials - username, password
+                    respectively.
+                :param timeout: (int) number of seconds to wait for the reload
+                :return whether the reload finished successfully
+    """
+    url = yangcatalog_api_prefix + 'load-cache'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        LOGGER.info('Sending request to reload cache {}'.format(url))
+        response = httpClient.post(url, None, auth=(credentials[0], credentials[1]))
+        if response.status_code != 202:
+            LOGGER.warning('Could not send a load-cache request')
+            return False
+        started = response.json()['info'] == 'Reload started'
+        reload_id = response.json()['reload-id']
+        result = 'In progress'
+        while result == 'In progress' and time.time() < deadline:
+            time.sleep(5)
+            response = httpClient.get('{}/{}'.format(url, reload_id),
+                                      auth=(credentials[0], credentials[1]),
+                                      headers={'Accept': 'application/json'})
+            if response.status_code != 200:
+                break
+            result = response.json()['info']['result']
+        if started:
+            LOGGER.info('Reload {} of cache ended with {}'.format(reload_id, result))
+            return result == 'Finished successfully'
+    LOGGER.warning('Reload of cache did not finish in {} seconds'.format(timeout))
+    return False
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parse hello messages and yang files to json dictionary. These"
                                                  " dictionaries are used for populating a yangcatalog. This script runs"
@@ -68,6 +107,8 @@ if __name__ == "__main__":
     config = ConfigParser.ConfigParser()
     config.read(config_path)
     is_uwsgi = config.get('General-Section', 'uwsgi')
+    httpClient.configure(int(config.get('General-Section', 'http-pool-size')),
+                         float(config.get('General-Section', 'http-timeout')))
     separator = ':'
     suffix = args.api_port
     if is_uwsgi == 'True':
@@ -148,12 +189,12 @@ if __name__ == "__main__":
 
             if '{"module": []}' not in read:
                 url = prefix + '/api/config/catalog/modules/'
-                response = requests.patch(url, json_modules_data,
-                                          auth=(args.credentials[0],
-                                                args.credentials[1]),
-                                          headers={
-                                              'Accept': 'application/vnd.yang.data+json',
-                                              'Content-type': 'application/vnd.yang.data+json'})
+                response = httpClient.patch(url, json_modules_data,
+                                            auth=(args.credentials[0],
+                                                  args.credentials[1]),
+                                            headers={
+                                                'Accept': 'application/vnd.yang.data+json',
+                                                'Content-type': 'application/vnd.yang.data+json'})
                 if response.status_code < 200 or response.status_code > 299:
                     LOGGER.error('Request with body on path {} failed with {}'
                                  .format(json_modules_data, url,
@@ -166,12 +207,12 @@ if __name__ == "__main__":
             }
     })
     url = prefix + '/api/config/catalog/modules/'
-    response = requests.patch(url, json_modules_data,
-                              auth=(args.credentials[0],
-                                    args.credentials[1]),
-                              headers={
-                                  'Accept': 'application/vnd.yang.data+json',
-                                  'Content-type': 'application/vnd.yang.data+json'})
+    response = httpClient.patch(url, json_modules_data,
+                                auth=(args.credentials[0],
+                                      args.credentials[1]),
+                                headers={
+                                    'Accept': 'application/vnd.yang.data+json',
+                                    'Content-type': 'application/vnd.yang.data+json'})
     if response.status_code < 200 or response.status_code > 299:
         LOGGER.error('Request with body on path {} failed with {}'
                      .format(json_modules_data, url,
@@ -194,12 +235,12 @@ if __name__ == "__main__":
 
                 # Make a PATCH request to create a root for each file
                 url = prefix + '/api/config/catalog/vendors/'
-                response = requests.patch(url, json_implementations_data,
-                                          auth=(args.credentials[0],
-                                                args.credentials[1]),
-                                          headers={
-                                              'Accept': 'application/vnd.yang.data+json',
-                                              'Content-type': 'application/vnd.yang.data+json'})
+                response = httpClient.patch(url, json_implementations_data,
+                                            auth=(args.credentials[0],
+                                                  args.credentials[1]),
+                                            headers={
+                                                'Accept': 'application/vnd.yang.data+json',
+                                                'Content-type': 'application/vnd.yang.data+json'})
                 if response.status_code < 200 or response.status_code > 299:
                     LOGGER.error('Request with body on path {} failed with {}'.
                                  format(json_implementations_data, url,
@@ -212,12 +253,12 @@ if __name__ == "__main__":
                     }
             })
             url = prefix + '/api/config/catalog/vendors/'
-            response = requests.patch(url, json_implementations_data,
-                                      auth=(args.credentials[0],
-                                            args.credentials[1]),
-                                      headers={
-                                          'Accept': 'application/vnd.yang.data+json',
-                                          'Content-type': 'application/vnd.yang.data+json'})
+            response = httpClient.patch(url, json_implementations_data,
+                                        auth=(args.credentials[0],
+                                              args.credentials[1]),
+                                        headers={
+                                            'Accept': 'application/vnd.yang.data+json',
+                                            'Content-type': 'application/vnd.yang.data+json'})
             if response.status_code < 200 or response.status_code > 299:
                 LOGGER.error('Request with body on path {} failed with {}'
                              .format(json_implementations_data, url,
@@ -230,16 +271,7 @@ if __name__ == "__main__":
         except OSError:
             # Be happy if deleted
             pass
-        LOGGER.info('Sending request to reload cache')
-        url = (yangcatalog_api_prefix + 'load-cache')
-        response = requests.post(url, None,
-                                 auth=(args.credentials[0],
-                                        args.credentials[1]),
-                                 headers={
-                                     'Accept': 'application/vnd.yang.data+json',
-                                     'Content-type': 'application/vnd.yang.data+json'})
-        if response.status_code != 201:
-            LOGGER.warning('Could not send a load-cache request')
+        reload_cache(yangcatalog_api_prefix, args.credentials)
 
         with open('../parseAndPopulate/' + direc + '/prepare.json', 'r') as f:
             all_modules = json.load(f)
@@ -248,8 +280,8 @@ if __name__ == "__main__":
         for module in all_modules['module']:
             LOGGER.info('Searching semver for {}'.format(module['name']))
             url = '{}search/name/{}'.format(yangcatalog_api_prefix, module['name'])
-            response = requests.get(url, auth=(args.credentials[0], args.credentials[1]),
-                                    headers={'Accept': 'application/json'})
+            response = httpClient.get(url, auth=(args.credentials[0], args.credentials[1]),
+                                      headers={'Accept': 'application/json'})
             if response.status_code == 404:
                 module['derived-semantic-version'] = '1.0.0'
                 new_modules.append(module)
@@ -365,7 +397,7 @@ if __name__ == "__main__":
                     mod['revision'] = modules[0]['revision']
                     mod['organization'] = modules[0]['organization']
                     modules[0]['semver'] = '1.0.0'
-                    response = requests.get(
+                    response = httpClient.get(
                         '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(args.protocol, args.ip, args.port,
                             mod['name'], mod['revision'], mod['organization']),
                         auth=('admin', 'admin'), headers={'Accept': 'application/vnd.yang.data+json'})
@@ -384,7 +416,7 @@ if __name__ == "__main__":
                             ver += 1
                             upgraded_version = '{}.{}.{}'.format(ver, 0, 0)
                             modules[x]['semver'] = upgraded_version
-                            response = requests.get(
+                            response = httpClient.get(
                                 '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                     args.protocol, args.ip, args.port,
                                     mod['name'], mod['revision'],
@@ -402,7 +434,7 @@ if __name__ == "__main__":
                                 ver += 1
                                 upgraded_version = '{}.{}.{}'.format(ver, 0, 0)
                                 modules[x]['semver'] = upgraded_version
-                                response = requests.get(
+                                response = httpClient.get(
                                     '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                         args.protocol, args.ip, args.port,
                                         mod['name'], mod['revision'],
@@ -448,7 +480,7 @@ if __name__ == "__main__":
                                     upgraded_version = '{}.{}.{}'.format(
                                         versions[0], versions[1], ver)
                                     modules[x]['semver'] = upgraded_version
-                                    response = requests.get(
+                                    response = httpClient.get(
                                         '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                             args.protocol, args.ip, args.port,
                                             mod['name'], mod['revision'],
@@ -467,7 +499,7 @@ if __name__ == "__main__":
                                     upgraded_version = '{}.{}.{}'.format(
                                         versions[0], ver, 0)
                                     modules[x]['semver'] = upgraded_version
-                                    response = requests.get(
+                                    response = httpClient.get(
                                         '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                             args.protocol, args.ip, args.port,
                                             mod['name'], mod['revision'],
@@ -485,7 +517,7 @@ if __name__ == "__main__":
                                 ver += 1
                                 upgraded_version = '{}.{}.{}'.format(ver, 0, 0)
                                 modules[x]['semver'] = upgraded_version
-                                response = requests.get(
+                                response = httpClient.get(
                                     '{}://{}:{}/api/config/catalog/modules/module/{},{},{}'.format(
                                         args.protocol, args.ip, args.port,
                                         mod['name'], mod['revision'],
@@ -507,9 +539,9 @@ if __name__ == "__main__":
                     search = {'name': new_dep['name'], 'revision': new_dep['revision']}
                 else:
                     search = {'name': new_dep['name']}
-                response = requests.post(yangcatalog_api_prefix
-                                         + 'search-filter',
-                                         auth=(args.credentials[0], args.credentials[1]),
+                response = httpClient.post(yangcatalog_api_prefix
+                                           + 'search-filter',
+                                           auth=(args.credentials[0], args.credentials[1]),
                     json={'input': search})
                 if response.status_code == 200:
                     mods = json.loads(response.content)['yang-catalog:modules'][
@@ -524,9 +556,9 @@ if __name__ == "__main__":
                             m['dependents'].append(new)
                             new_modules.append(m)
 
-            response = requests.post(yangcatalog_api_prefix + 'search-filter',
-                                     auth=(
-                                     args.credentials[0], args.credentials[1]),
+            response = httpClient.post(yangcatalog_api_prefix + 'search-filter',
+                                       auth=(
+                                       args.credentials[0], args.credentials[1]),
                           json={'input': {'dependencies': [{'name': name}]}})
             if response.status_code == 200:
                 mods = json.loads(response.content)['yang-catalog:modules']['module']
@@ -556,12 +588,12 @@ if __name__ == "__main__":
             json_modules_data = json.dumps({'modules': {'module': new_modules[x*250: (x*250)+250]}})
             if '{"module": []}' not in json_modules_data:
                 url = prefix + '/api/config/catalog/modules/'
-                response = requests.patch(url, json_modules_data,
-                                          auth=(args.credentials[0],
-                                                args.credentials[1]),
-                                          headers={
-                                              'Accept': 'application/vnd.yang.data+json',
-                                              'Content-type': 'application/vnd.yang.data+json'})
+                response = httpClient.patch(url, json_modules_data,
+                                            auth=(args.credentials[0],
+                                                  args.credentials[1]),
+                                            headers={
+                                                'Accept': 'application/vnd.yang.data+json',
+                                                'Content-type': 'application/vnd.yang.data+json'})
                 if response.status_code < 200 or response.status_code > 299:
                     LOGGER.error('Request with body on path {} failed with {}'.
                                  format(json_modules_data, url,
@@ -571,12 +603,12 @@ if __name__ == "__main__":
             {'modules': {'module': new_modules[rest: rest + mod]}})
         if '{"module": []}' not in json_modules_data:
             url = prefix + '/api/config/catalog/modules/'
-            response = requests.patch(url, json_modules_data,
-                                      auth=(args.credentials[0],
-                                            args.credentials[1]),
-                                      headers={
-                                          'Accept': 'application/vnd.yang.data+json',
-                                          'Content-type': 'application/vnd.yang.data+json'})
+            response = httpClient.patch(url, json_modules_data,
+                                        auth=(args.credentials[0],
+                                              args.credentials[1]),
+                                        headers={
+                                            'Accept': 'application/vnd.yang.data+json',
+                                            'Content-type': 'application/vnd.yang.data+json'})
             if response.status_code < 200 or response.status_code > 299:
                 LOGGER.error('Request with body on path {} failed with {}'.
                              format(json_modules_data, url,
@@ -586,13 +618,7 @@ if __name__ == "__main__":
         except OSError:
             # Be happy if deleted
             pass
-        url = (yangcatalog_api_prefix + 'load-cache')
-        LOGGER.info('{}'.format(url))
-        response = requests.post(url, None,
-                                 auth=(args.credentials[0],
-                                       args.credentials[1]))
-        if response.status_code != 201:
-            LOGGER.warning('Could not send a load-cache request')
+        reload_cache(yangcatalog_api_prefix, args.credentials)
         if args.notify_indexing:
             LOGGER.info('Sending files for indexing')
             send_to_indexing(yangcatalog_api_prefix,
@@ -1,19 +1,17 @@
 import ConfigParser
 import argparse
-import base64
 import fnmatch
 import json
 import os
 import shutil
 import subprocess
-import urllib2
 import requests
-from urllib2 import URLError
 
 import jinja2
 import time
 
 import tools.utility.log as log
+from tools.utility import httpClient
 from tools.utility import yangParser
 from tools.utility.util import get_curr_dir
 
@@ -53,21 +51,18 @@ def find_first_file(directory, pattern, pattern_with_revision):
 
 def http_request(path, method, json_data, http_credentials, header):
     try:
-        opener = urllib2.build_opener(urllib2.HTTPHandler)
-        request = urllib2.Request(path, data=json_data)
-        request.add_header('Content-Type', header)
-        request.add_header('Accept', header)
-        base64string = base64.b64encode('%s:%s' % (http_credentials[0], http_credentials[1]))
-        request.add_header("Authorization", "Basic %s" % base64string)
-        request.get_method = lambda: method
-        return opener.open(request)
-    except urllib2.HTTPError as e:
+        response = httpClient.request(method, path, data=json_data,
+                                      auth=(http_credentials[0], http_credentials[1]),
+                                      headers={'Content-Type': header, 'Accept': header})
+        response.raise_for_status()
+        return response
+    except requests.HTTPError as e:
         if method == 'DELETE':
             return
         LOGGER.error('Could not send request with body {} and path {}'.format(json_data, path))
-        if e.code == 404:
+        if e.response.status_code == 404:
             return None
-    except URLError as e:
+    except requests.ConnectionError as e:
         LOGGER.error('Could not send request with body {} and path {} {}'.format(json_data, path, e))
         raise e
 
@@ -113,6 +108,7 @@ def get_specifics(path_dir):
     """
     passed = 0
     num_in_catalog = 0
+    modules = []
     for mod_git in list_of_yang_modules_in_subdir(path_dir):
         try:
             revision = yangParser.parse(os.path.abspath(mod_git)).search('revision')[0].arg
@@ -129,7 +125,7 @@ def get_specifics(path_dir):
             path = yangcatalog_api_prefix + 'search/name/' + name
             module_exist = http_request(path, 'GET', '', credentials.split(' '), 'application/vnd.yang.data+json')
             if module_exist:
-                data = module_exist.read()
+                data = module_exist.content
                 org = json.loads(data)['yang-catalog:modules']['module'][0]['organization']
                 rev = json.loads(data)['yang-catalog:modules']['module'][0]['revision']
                 status = json.loads(data)['yang-catalog:modules']['module'][0]['compilation-status']
@@ -138,13 +134,15 @@ def get_specifics(path_dir):
                         passed += 1
                     num_in_catalog += 1
         else:
-            organization = organization.replace(' ', '%20')
-            path = yangcatalog_api_prefix + 'search/modules/' + name + ','\
-                   + revision + ',' + organization
-            module_exist = http_request(path, 'GET', '', credentials.split(' '), 'application/vnd.yang.data+json')
-            if module_exist:
-                data = module_exist.read()
-                if 'passed' == json.loads(data)['module'][0]['compilation-status']:
+            modules.append({'name': name, 'revision': revision,
+                            'organization': organization})
+    if len(modules) > 0:
+        path = yangcatalog_api_prefix + 'search/modules?fields=compilation-status'
+        body = json.dumps({'input': {'module': modules}})
+        modules_exist = http_request(path, 'POST', body, credentials.split(' '), 'application/json')
+        if modules_exist:
+            for module in json.loads(modules_exist.content)['module']:
+                if 'passed' == module.get('compilation-status'):
                     passed += 1
                 num_in_catalog += 1
     return [num_in_catalog, passed]
@@ -251,6 +249,8 @@ if __name__ == '__main__':
     move_to = config.get('Statistics-Section', 'file-location')
     auth = credentials.split(' ')
     is_uwsgi = config.get('General-Section', 'uwsgi')
+    httpClient.configure(int(config.get('General-Section', 'http-pool-size')),
+                         float(config.get('General-Section', 'http-timeout')))
     separator = ':'
     suffix = api_port
     if is_uwsgi == 'True':
@@ -260,7 +260,7 @@ if __name__ == '__main__':
                                                    separator, suffix)
 
     path = yangcatalog_api_prefix + 'search/vendors/vendor/cisco'
-    res = requests.get(path, auth=(auth[0], auth[1]),
+    res = httpClient.get(path, auth=(auth[0], auth[1]),
                  headers={'Accept': 'application/json'})
     vendors_data = json.loads(res.content)
     xr = []
@@ -353,8 +353,8 @@ if __name__ == '__main__':
         nx_values.append(values)
 
     path = yangcatalog_api_prefix + 'search/modules'
-    all_modules_data = (requests.get(path, auth=(auth[0], auth[1]),
-                                     headers={'Accept': 'application/json'})
+    all_modules_data = (httpClient.get(path, auth=(auth[0], auth[1]),
+                                       headers={'Accept': 'application/json'})
                         .content)
     all_modules_data = json.loads(all_modules_data)
     all_modules_data_unique = set()
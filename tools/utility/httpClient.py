@@ -0,0 +1,88 @@
+import urlparse
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tools.utility.log as log
+
+LOGGER = log.get_logger(__name__)
+
+__sessions = {}
+__lock = Lock()
+__pool_size = 10
+__timeout = None
+
+
+def configure(pool_size=10, timeout=None):
+    """Set size of the connection pools and default timeout of the requests.
+    If the settings change sessions that were already created are closed and
+    created again with the new settings on their next request.
+            Arguments:
+                :param pool_size: (int) maximal number of connections kept alive
+                    to one host
+                :param timeout: (float) number of seconds to wait for the server
+                    to respond. None to wait forever
+    """
+    global __pool_size, __timeout
+    with __lock:
+        if (pool_size, timeout) == (__pool_size, __timeout):
+            return
+        __pool_size = pool_size
+        __timeout = timeout
+        for s in __sessions.values():
+            s.close()
+        __sessions.clear()
+
+
+def session(url):
+    """Get session shared by all the requests to the host of the url. Session
+    keeps connections to the host alive so they are reused by the following
+    requests.
+            Arguments:
+                :param url: (str) url of the request
+                :return requests.Session for protocol, host and port of the url
+    """
+    parsed = urlparse.urlsplit(url)
+    key = (parsed.scheme, parsed.hostname, parsed.port)
+    with __lock:
+        s = __sessions.get(key)
+        if s is None:
+            LOGGER.debug('Creating http session for {}://{}:{}'.format(*key))
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=__pool_size)
+            s.mount(parsed.scheme + '://', adapter)
+            __sessions[key] = s
+        return s
+
+
+def request(method, url, **kwargs):
+    """Send request using session of the url. Arguments are the same as the
+    ones of requests.request. If timeout is not set default timeout is used.
+            Arguments:
+                :param method: (str) request method
+                :param url: (str) url of the request
+                :return requests.Response
+    """
+    kwargs.setdefault('timeout', __timeout)
+    return session(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, data=None, **kwargs):
+    return request('POST', url, data=data, **kwargs)
+
+
+def put(url, data=None, **kwargs):
+    return request('PUT', url, data=data, **kwargs)
+
+
+def patch(url, data=None, **kwargs):
+    return request('PATCH', url, data=data, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
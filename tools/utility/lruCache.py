@@ -0,0 +1,64 @@
+import collections
+import time
+from threading import Lock
+
+
+class LRUCache:
+    """Thread safe dictionary bounded by number of entries. When the cache is
+    full the least recently used entry is evicted. If ttl is set entries also
+    expire ttl seconds after they were set.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        """
+                Arguments:
+                    :param max_size: (int) maximal number of entries
+                    :param ttl: (int) number of seconds after which an entry
+                        expires. None if entries do not expire.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__data = collections.OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key, default=None):
+        """Get value stored under the key and mark it as the most recently used
+                Arguments:
+                    :param key: key of the entry
+                    :param default: value returned if there is no valid entry
+                    :return value stored under the key or default
+        """
+        with self.__lock:
+            entry = self.__data.pop(key, None)
+            if entry is None or (self.ttl is not None and time.time() - entry[1] > self.ttl):
+                self.misses += 1
+                return default
+            self.__data[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Store value under the key and evict least recently used entries
+        if the cache is full
+                Arguments:
+                    :param key: key of the entry
+                    :param value: value to store
+        """
+        with self.__lock:
+            self.__data.pop(key, None)
+            self.__data[key] = (value, time.time())
+            while len(self.__data) > self.max_size:
+                self.__data.popitem(last=False)
+
+    def delete(self, key):
+        with self.__lock:
+            self.__data.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+
+    def __len__(self):
+        return len(self.__data)